@@ -2,234 +2,675 @@ import asyncio
 from contextlib import AsyncExitStack, asynccontextmanager
 from random import randrange
 from asyncio_mqtt import Client, MqttError
+import hashlib
 import json
 import logging
 import os
+import time
 
 import epson_projector as epson
 from epson_projector.const import (
-    EPSON_KEY_COMMANDS, 
+    EPSON_KEY_COMMANDS,
     EPSON_CONFIG_RANGES,
     EPSON_OPTIONS,
     EPSON_READOUTS,
+    LENS_MEMORY,
+    POLL_INTERVALS,
+    POWER,
+    PRIORITY_POLL,
     PWR_OFF_STATE,
     PWR_ON_STATE,
+    SERIAL,
+    TCP,
+    TCP_PORT,
+    DEFAULT_IDENTITY_CACHE_PATH,
 )
+from epson_projector.identity import IdentityCache
+from epson_projector.metrics import METRICS, monitor_event_loop_lag, start_metrics_server
+from epson_projector.registry import OPTION_COMMANDS, OPTION_NAMES
 
 BASE_TOPIC = os.environ.get('MQTT_BASE_TOPIC') or 'epson'
 MQTT_HOST = os.environ.get('MQTT_HOST')
+# Either a single IP, or a comma separated list of `ip` / `name=ip` entries for several projectors.
+# An entry may also name the ESC/VP.net port, e.g. `127.0.0.1:3629`.
 EPSON_IP = os.environ.get('EPSON_IP')
-EPSON_UNIQUE_IDENTIFIER = f'EPSON_AT_{EPSON_IP}'
-
-if not MQTT_HOST or not EPSON_IP:
-    raise Exception('Missing environment config! Please make sure MQTT_HOST and EPSON_IP environment variables are set.')
+# Power heartbeat, other properties are polled on their own adaptive intervals
+POLL_INTERVAL = float(os.environ.get('POLL_INTERVAL') or POLL_INTERVALS[POWER])
+POLL_TIMEOUT = float(os.environ.get('POLL_TIMEOUT') or 15)
+POLL_CONCURRENCY = int(os.environ.get('POLL_CONCURRENCY') or 4)
+# Unchanged state is only republished once per this many seconds
+FULL_REFRESH_INTERVAL = float(os.environ.get('FULL_REFRESH_INTERVAL') or 300)
+# Serial numbers learned while projectors were on, so unique IDs are stable when they are off
+IDENTITY_CACHE_PATH = os.environ.get('IDENTITY_CACHE_PATH') or DEFAULT_IDENTITY_CACHE_PATH
+LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'INFO').upper()
+# Prometheus metrics are served on this port when set
+METRICS_PORT = int(os.environ.get('METRICS_PORT') or 0)
+# Seconds between metrics published to <base topic>/diagnostics, 0 disables them
+DIAGNOSTICS_INTERVAL = float(os.environ.get('DIAGNOSTICS_INTERVAL') or 60)
+# Discovery configs published at the same time
+DISCOVERY_IN_FLIGHT = int(os.environ.get('DISCOVERY_IN_FLIGHT') or 10)
+# Seconds to wait for the broker to hand out the retained discovery digest
+DISCOVERY_DIGEST_TIMEOUT = 1
+# Topics with a state update waiting for the broker, the oldest is dropped beyond this
+PUBLISH_QUEUE_SIZE = int(os.environ.get('PUBLISH_QUEUE_SIZE') or 1000)
+# Seconds a config value waits for a newer one before it is written, e.g. while a slider is dragged
+COMMAND_DEBOUNCE = float(os.environ.get('COMMAND_DEBOUNCE') or 0.25)
+# Seconds before a failed identify is retried, doubled after every failure up to IDENTIFY_RETRY_LIMIT
+IDENTIFY_RETRY_INTERVAL = 60
+IDENTIFY_RETRY_LIMIT = 3600
+# `topics` publishes every property to its own topic, `json` one document per projector to <base topic>/state
+STATE_FORMAT = (os.environ.get('STATE_FORMAT') or 'topics').lower()
 
 _LOGGER = logging.getLogger(__name__)
 
-logging.getLogger("asyncio").setLevel(logging.DEBUG)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(   
-    logging.Formatter("%(asctime)s - [%(threadName)s] - %(name)s - %(levelname)s - %(message)s")
-)
-_LOGGER.addHandler(console_handler)
-_LOGGER.setLevel(logging.DEBUG)
 
-async def epson_projector_bridge():
+class EpsonDevice:
+    """A projector served by the bridge, with its own topic namespace."""
+
+    def __init__(
+        self, host, name=None, namespaced=False, port=TCP_PORT, identity_cache=None, type=TCP, poll_slots=None,
+    ):
+        self.host = host
+        self.port = port
+        self.type = type
+        self.name = name or host
+        self.projector = epson.Projector(
+            host=host, type=type, port=port, identity_cache=identity_cache,
+            poll_intervals={**POLL_INTERVALS, POWER: POLL_INTERVAL},
+            poll_slots=poll_slots,
+            poll_timeout=POLL_TIMEOUT,
+        )
+        # Last power state watched, None until it is known
+        self.power = None
+        # Last value published per state topic, publishing is skipped while it is unchanged
+        self.last_published = {}
+        # State document of the json state format, and whether it changed since it was published
+        self.state_document = {}
+        self.state_dirty = False
+        self.background_tasks = set()
+        self.identifying = False
+        self.identified = False
+        # Monotonic time before which identify is not retried, and the delay of the next retry
+        self.identify_after = 0
+        self.identify_retry_delay = IDENTIFY_RETRY_INTERVAL
+        # (unique identifier, discovery configs, their digest) of the last discovery built
+        self.discovery = None
+        # Latest commanded value per config key not written yet, and the task writing it
+        self.pending_writes = {}
+        self.write_tasks = {}
+        # Value published before the first pending write per config key, restored if writing fails
+        self.rollback_values = {}
+        # Task reporting lens motion after a lens memory recall, until the lens settled
+        self.lens_task = None
+
+        if namespaced:
+            slug = self.name.replace('.', '_').replace(' ', '_').replace('/', '_').strip('_')
+            self.base_topic = f"{BASE_TOPIC}/{slug}"
+            self.node_id = f"{BASE_TOPIC}_{slug}"
+            self.name_prefix = f"{self.name} "
+        else:
+            # A single projector keeps the original topics so existing installs don't change.
+            self.base_topic = BASE_TOPIC
+            self.node_id = BASE_TOPIC
+            self.name_prefix = ""
+
+    def forget_published(self):
+        """Publish all state again, e.g. when the broker may have lost it."""
+        self.last_published.clear()
+        self.state_dirty = True
+
+    @property
+    def unique_identifier(self):
+        serial = self.projector.identity.get("serial")
+        if serial:
+            return f'EPSON_{serial}'
+        if self.type == SERIAL:
+            return f"EPSON_AT_{self.host.strip('/').replace('/', '_')}"
+        if self.port == TCP_PORT:
+            return f'EPSON_AT_{self.host}'
+        return f'EPSON_AT_{self.host}_{self.port}'
+
+
+class PublishQueue:
+    """
+    Outbound MQTT messages, drained by run() so polling never waits on the broker.
+
+    Stands in for the client where state is published. While the broker is
+    behind, a newer message to a topic replaces the one still waiting, so
+    only the latest value of every topic goes out. The queue outlives MQTT
+    sessions: whatever is queued while disconnected, e.g. by a write still
+    being confirmed, goes out on the next session.
+    """
+
+    def __init__(self, max_size=PUBLISH_QUEUE_SIZE):
+        self.max_size = max_size
+        # topic -> (payload, retain), in the order topics were first queued
+        self.pending = {}
+        self.wakeup = asyncio.Event()
+
+    async def publish(self, topic, payload, retain=False):
+        """Queue message without waiting for it to be sent, like Client.publish otherwise."""
+        if topic in self.pending:
+            METRICS.inc("epson_bridge_publishes_coalesced_total")
+        elif len(self.pending) >= self.max_size:
+            oldest = next(iter(self.pending))
+            del self.pending[oldest]
+            METRICS.inc("epson_bridge_publishes_dropped_total")
+            _LOGGER.warning("Publish queue full, dropping update of %s", oldest)
+        self.pending[topic] = (payload, retain)
+        METRICS.set("epson_bridge_publish_queue_depth", len(self.pending))
+        self.wakeup.set()
+
+    async def run(self, client):
+        """Publish queued messages one by one with client, until cancelled or the client fails."""
+        while True:
+            while self.pending:
+                topic = next(iter(self.pending))
+                message = self.pending[topic]
+                payload, retain = message
+                await client.publish(topic, payload, retain=retain)
+                # Kept if the session ended before it was sent, or a newer message replaced it
+                if self.pending.get(topic) is message:
+                    del self.pending[topic]
+                METRICS.set("epson_bridge_publish_queue_depth", len(self.pending))
+            self.wakeup.clear()
+            await self.wakeup.wait()
+
+
+def parse_devices(config, identity_cache=None, poll_slots=None):
+    entries = [entry.strip() for entry in config.split(',') if entry.strip()]
+    devices = []
+    for entry in entries:
+        name, _, address = entry.rpartition('=')
+        address = address.strip()
+        if address.startswith('/'):
+            # Serial device path, projector is wired to its RS-232 port
+            devices.append(EpsonDevice(
+                address, name.strip() or None, namespaced=len(entries) > 1, port=None,
+                identity_cache=identity_cache, type=SERIAL, poll_slots=poll_slots,
+            ))
+            continue
+        host, _, port = address.partition(':')
+        devices.append(EpsonDevice(
+            host, name.strip() or None, namespaced=len(entries) > 1, port=int(port or TCP_PORT),
+            identity_cache=identity_cache, poll_slots=poll_slots,
+        ))
+    return devices
+
+async def epson_projector_bridge(devices, outbox=None):
     async with AsyncExitStack() as stack:
         tasks = set()
         stack.push_async_callback(cancel_tasks, tasks)
 
         client = Client(MQTT_HOST)
         await stack.enter_async_context(client)
-
-        projector = epson.Projector(host=EPSON_IP, type='tcp')
-
-        await publish_homeassistant_discovery_config(projector, client)
-
-        manager = client.filtered_messages(f"{BASE_TOPIC}/command/#")
-        messages = await stack.enter_async_context(manager)
-        task = asyncio.create_task(process_commands(messages, projector, client))
-        tasks.add(task)
+        # State goes through the queue, a slow broker must not hold up polling
+        if outbox is None:
+            outbox = PublishQueue()
+        tasks.add(asyncio.create_task(outbox.run(client)))
+
+        for device in devices:
+            # Nothing is known to be on the broker after a (re)connect
+            device.forget_published()
+            # Discovery runs alongside polling, retained state waits on the broker for it
+            tasks.add(asyncio.create_task(publish_homeassistant_discovery_config(device, client)))
+
+            manager = client.filtered_messages(f"{device.base_topic}/command/#")
+            messages = await stack.enter_async_context(manager)
+            task = asyncio.create_task(process_commands(messages, device, outbox))
+            tasks.add(task)
 
         # Subscribe to topic(s)
         # 🤔 Note that we subscribe *after* starting the message
         # loggers. Otherwise, we may miss retained messages.
-        await client.subscribe(f"{BASE_TOPIC}/command/#")
+        for device in devices:
+            await client.subscribe(f"{device.base_topic}/command/#")
 
-        task =  asyncio.create_task(poll_projector_status(client, projector))
-
-        tasks.add(task)
+        for device in devices:
+            tasks.add(asyncio.create_task(watch_projector(outbox, device)))
+            tasks.add(asyncio.create_task(refresh_state(outbox, device)))
+            if DIAGNOSTICS_INTERVAL:
+                tasks.add(asyncio.create_task(publish_diagnostics(outbox, device)))
 
         # Wait for everything to complete (or fail due to, e.g., network
         # errors)
         await asyncio.gather(*tasks)
 
-async def poll_projector_status(client, projector):
+async def watch_projector(client, device):
+    """Publish state of projector whenever it changes, the library polls for it."""
+    keys = [POWER, *EPSON_CONFIG_RANGES, *EPSON_READOUTS, *EPSON_OPTIONS]
+    changes_stream = device.projector.watch(keys)
+    try:
+        async for changes in changes_stream:
+            await publish_changes(client, device, changes)
+    finally:
+        await changes_stream.aclose()
+
+async def publish_changes(client, device, changes):
+    if POWER in changes:
+        device.power = changes.pop(POWER)
+        # Other codes show up while warming up or cooling down, those are left unpublished
+        if device.power == PWR_OFF_STATE:
+            await publish_state(client, device, "power", "OFF")
+        elif device.power == PWR_ON_STATE:
+            await publish_state(client, device, "power", "ON")
+
+    if device.power == PWR_ON_STATE:
+        identify_in_background(device)
+    for key_name, value in changes.items():
+        if writing(device, key_name):
+            continue
+        await publish_state(client, device, key_name, value)
+    await flush_state(client, device)
+
+async def refresh_state(client, device):
+    """Publish all state again every FULL_REFRESH_INTERVAL, unchanged state is skipped otherwise."""
     while True:
-        try:
-            powerStatus = await projector.get_power()
-            if powerStatus == PWR_OFF_STATE:
-                await publish_message(client, f"{BASE_TOPIC}/state/power", "OFF")
+        await asyncio.sleep(FULL_REFRESH_INTERVAL)
+        device.projector.save_timeout_profile()
+        published = dict(device.last_published)
+        device.forget_published()
+        for topic, value in published.items():
+            await publish_message(client, topic, value)
+            device.last_published[topic] = value
+            METRICS.inc("epson_bridge_state_publishes_total", host=device.host)
+        await flush_state(client, device)
+
+async def get_all_config_values(client, device, keys):
+    await asyncio.gather(
+        get_all_range_values(client, device, keys),
+        get_all_option_values(client, device, keys),
+    )
 
-            if powerStatus == PWR_ON_STATE:
-                # These aren't mutally exclusive, during initial startup may give weird codes which then breaks fetching
-                # the rest of the config values -- only fetch them if we know it's on
-                await publish_message(client, f"{BASE_TOPIC}/state/power", "ON")
-                await get_all_config_values(client, projector)
-                
+async def get_all_range_values(client, device, keys):
+    configs = [key for key in keys if key in EPSON_CONFIG_RANGES or key in EPSON_READOUTS]
+    if not configs:
+        return
 
-        except Exception as inst:
-            print(f"---- Exception thrown: {inst}")
+    values = await device.projector.read_config_values(configs, priority=PRIORITY_POLL)
+    for key_name, value in values.items():
+        if isinstance(value, Exception):
+            _LOGGER.debug("Reading %s failed: %s", key_name, value)
+            continue
 
-        await asyncio.sleep(10)
+        if not writing(device, key_name):
+            await publish_state(client, device, key_name, int(value))
 
-async def get_all_config_values(client, projector):
-    for key_name in EPSON_CONFIG_RANGES:
-        try:
-            value = await projector.read_config_value(key_name)
-        
-            await publish_message(client, f"{BASE_TOPIC}/state/{key_name}", int(value))
-        except Exception as inst:
-            print(f"---- Exception thrown: {inst}")
-    
-    for key_name in EPSON_READOUTS:
-        try:
-            value = await projector.read_config_value(key_name)
-        
-            await publish_message(client, f"{BASE_TOPIC}/state/{key_name}", int(value))
-        except Exception as inst:
-            print(f"---- Exception thrown: {inst}")
+async def get_all_option_values(client, device, keys):
+    options = {key: EPSON_OPTIONS[key] for key in keys if key in EPSON_OPTIONS}
+    if not options:
+        return
 
-    await get_all_option_values(client, projector)
+    raw_values = await device.projector.get_properties(
+        [config['epson_command'] for config in options.values()],
+        priority=PRIORITY_POLL,
+    )
+    for key_name, config in options.items():
+        raw_value = raw_values[config['epson_command']]
+        if isinstance(raw_value, Exception):
+            _LOGGER.debug("Reading %s failed: %s", key_name, raw_value)
+            continue
 
-async def get_all_option_values(client, projector):
-    for key_name, config in EPSON_OPTIONS.items():
+        option_name = OPTION_NAMES[key_name].get(raw_value)
+        if option_name is not None and not writing(device, key_name):
+            await publish_state(client, device, key_name, option_name)
+
+def identify_in_background(device):
+    """Learn serial number and features the first time projector is seen on, backing off on failure."""
+    if device.identified or device.identifying or "features" in device.projector.identity:
+        return
+    if time.monotonic() < device.identify_after:
+        return
+
+    async def identify():
         try:
-            raw_value = await projector.get_property(config['epson_command'])
-            for option in config['options']:
-                if raw_value == option[2]:    
-                    await publish_message(client, f"{BASE_TOPIC}/state/{key_name}", option[0])
-                    break
+            identity = await device.projector.identify()
         except Exception as inst:
-            print(f"---- Exception thrown: {inst}")
+            _LOGGER.warning("Identifying %s failed: %s", device.name, inst)
+            identity = {}
+        finally:
+            device.identifying = False
+        device.identified = "features" in identity
+        if not device.identified:
+            # e.g. queries timed out, try again later rather than on every state change
+            device.identify_after = time.monotonic() + device.identify_retry_delay
+            device.identify_retry_delay = min(device.identify_retry_delay * 2, IDENTIFY_RETRY_LIMIT)
+
+    device.identifying = True
+    task = asyncio.create_task(identify())
+    device.background_tasks.add(task)
+    task.add_done_callback(device.background_tasks.discard)
+
+async def publish_state(client, device, key_name, value):
+    if STATE_FORMAT == 'json':
+        # Goes out with the whole document on the next flush_state
+        if device.state_document.get(key_name) != value:
+            device.state_document[key_name] = value
+            device.state_dirty = True
+        return
+
+    topic = f"{device.base_topic}/state/{key_name}"
+    if device.last_published.get(topic) == value:
+        return
+
+    await publish_message(client, topic, value)
+    device.last_published[topic] = value
+    METRICS.inc("epson_bridge_state_publishes_total", host=device.host)
+
+async def flush_state(client, device):
+    """Publish state document if it changed, nothing to do for the topics state format."""
+    if STATE_FORMAT != 'json' or not device.state_dirty:
+        return
+
+    device.state_dirty = False
+    await publish_message(
+        client, f"{device.base_topic}/state", json.dumps(device.state_document, separators=(',', ':'))
+    )
+    METRICS.inc("epson_bridge_state_publishes_total", host=device.host)
+
+def published_state(device, key_name):
+    """Last value of key_name handed to the broker, None if unknown."""
+    if STATE_FORMAT == 'json':
+        return device.state_document.get(key_name)
+    return device.last_published.get(f"{device.base_topic}/state/{key_name}")
 
 async def publish_message(client, topic, message):
-    _LOGGER.debug(f"Publishing to MQTT: {topic} -- {message}\n")
+    _LOGGER.debug("Publishing to MQTT: %s -- %s", topic, message)
     await client.publish(topic, message, retain = True)
 
-async def process_commands(messages, projector, client):
+async def write_through(client, device, key_name, value, send):
+    """Publish commanded value right away, then confirm it or roll it back."""
+    previous = published_state(device, key_name)
+    await publish_state(client, device, key_name, value)
+    await flush_state(client, device)
+    await confirm_write(client, device, key_name, send, previous)
+
+async def confirm_write(client, device, key_name, send, previous):
+    """Send value published for key_name, rolling back to previous if that fails, then read it back."""
+    try:
+        await send()
+    except Exception:
+        # A newer value waiting to be written is published already, it stays.
+        if previous is not None and key_name not in device.pending_writes:
+            await publish_state(client, device, key_name, previous)
+            await flush_state(client, device)
+        raise
+    finally:
+        # Only the last of a burst of writes is read back, reading the others would undo newer values.
+        if key_name not in device.pending_writes:
+            task = asyncio.create_task(read_back_state(client, device, key_name))
+            device.background_tasks.add(task)
+            task.add_done_callback(device.background_tasks.discard)
+
+async def debounce_config_write(client, device, key_name, value):
+    """
+    Publish config value right away, write it after COMMAND_DEBOUNCE unless
+    a newer value replaces it by then.
+    """
+    if key_name in device.pending_writes:
+        METRICS.inc("epson_bridge_writes_dropped_total", host=device.host)
+    else:
+        # Value to roll back to if the write of this burst of values fails
+        device.rollback_values[key_name] = published_state(device, key_name)
+    device.pending_writes[key_name] = value
+    await publish_state(client, device, key_name, value)
+    await flush_state(client, device)
+    if key_name not in device.write_tasks:
+        task = asyncio.create_task(flush_config_writes(client, device, key_name))
+        device.write_tasks[key_name] = task
+        device.background_tasks.add(task)
+        task.add_done_callback(device.background_tasks.discard)
+
+async def flush_config_writes(client, device, key_name):
+    """Write latest value of config until no newer one is waiting."""
+    try:
+        while key_name in device.pending_writes:
+            await asyncio.sleep(COMMAND_DEBOUNCE)
+            value = device.pending_writes.pop(key_name)
+            previous = device.rollback_values.pop(key_name, None)
+            try:
+                await confirm_write(
+                    client, device, key_name,
+                    lambda: device.projector.send_config_value(key_name, value),
+                    previous,
+                )
+            except Exception as inst:
+                _LOGGER.warning("Writing %s=%s on %s failed: %s", key_name, value, device.name, inst)
+    finally:
+        del device.write_tasks[key_name]
+
+def writing(device, key_name):
+    """True while commanded values of key_name are being written, what is read meanwhile is stale."""
+    return key_name in device.pending_writes or key_name in device.write_tasks
+
+async def read_back_state(client, device, key_name):
+    METRICS.inc("epson_bridge_read_backs_total", host=device.host)
+    try:
+        await get_all_config_values(client, device, [key_name])
+        await flush_state(client, device)
+    except Exception as inst:
+        _LOGGER.warning("Reading back %s failed: %s", key_name, inst)
+
+def follow_lens(client, device):
+    """Report lens as moving until it settled, its positions are published by watch_projector meanwhile."""
+    async def follow():
+        await publish_state(client, device, "lens_moving", "ON")
+        await flush_state(client, device)
+        try:
+            await device.projector.wait_lens_settled()
+        except Exception as inst:
+            _LOGGER.warning("Waiting for lens of %s to settle failed: %r", device.name, inst)
+        finally:
+            await publish_state(client, device, "lens_moving", "OFF")
+            await flush_state(client, device)
+
+    if device.lens_task:
+        # A new recall redirects the lens, only the last one is followed
+        device.lens_task.cancel()
+    device.lens_task = asyncio.create_task(follow())
+    device.background_tasks.add(device.lens_task)
+    device.lens_task.add_done_callback(device.background_tasks.discard)
+
+async def publish_diagnostics(client, device):
+    """Publish metrics of the projector and the bridge every DIAGNOSTICS_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(DIAGNOSTICS_INTERVAL)
+        diagnostics = METRICS.snapshot(host=device.host)
+        diagnostics.update(
+            (name, value) for name, value in METRICS.snapshot().items()
+            if name.startswith("epson_event_loop")
+        )
+        await client.publish(f"{device.base_topic}/diagnostics", json.dumps(diagnostics))
+
+async def process_commands(messages, device, client):
+    projector = device.projector
     async for message in messages:
         # 🤔 Note that we assume that the message paylod is an
         # UTF8-encoded string (hence the `bytes.decode` call).
-        command = message.topic[len(f"{BASE_TOPIC}/command/"):]
+        command = message.topic[len(f"{device.base_topic}/command/"):]
         value = message.payload.decode()
-        
-        print("")
-        print(f'-------------- Executing command {command} with {value}')
+
+        _LOGGER.info("Executing command %s with %s on %s", command, value, device.name)
+        METRICS.inc("epson_bridge_commands_total", host=device.host)
         try:
             if command in EPSON_CONFIG_RANGES:
-                await projector.send_config_value(command, value)
-                
-                # new_value = await projector.read_config_value(command)
-                # await publish_message(client, f"{BASE_TOPIC}/state/{command}", int(new_value))
+                value = int(value)
+                # Invalid values are refused before they are published
+                projector.config_value_command(command, value)
+                await debounce_config_write(client, device, command, value)
 
             elif command in EPSON_KEY_COMMANDS:
                 await projector.send_command(command)
+                if EPSON_KEY_COMMANDS[command][0][0] == LENS_MEMORY:
+                    follow_lens(client, device)
             elif command in EPSON_OPTIONS:
-                for option in EPSON_OPTIONS[command]['options']:
-                    if value == option[0]:
-                        await projector.send_command(option[1])
-                        break
+                option_command = OPTION_COMMANDS[command].get(value)
+                if option_command is not None:
+                    await write_through(
+                        client, device, command, value,
+                        lambda: projector.send_command(option_command),
+                    )
             elif command == "power":
                 if value == 'OFF':
                     await projector.send_command("PWR OFF")
                 else:
                     await projector.send_command("PWR ON")
             else:
-                print(f"Unknown command {command}")
+                _LOGGER.warning("Unknown command %s", command)
         except Exception as inst:
-            print(f"---- Exception thrown: {inst}")
-        print("")
-
-async def publish_homeassistant_discovery_config(projector, client):
-    
-    await publish_message(client, f"homeassistant/switch/{BASE_TOPIC}/power/config", 
+            _LOGGER.warning("Command %s on %s failed: %s", command, device.name, inst)
+
+def state_config(device, key_name):
+    """Discovery fields reading the state of key_name."""
+    if STATE_FORMAT == 'json':
+        return {
+            "state_topic": f"{device.base_topic}/state",
+            "value_template": f"{{{{ value_json.{key_name} }}}}",
+        }
+    return {"state_topic": f"{device.base_topic}/state/{key_name}"}
+
+def availability_config(device):
+    """Discovery fields making entities unavailable while projector is off."""
+    if STATE_FORMAT == 'json':
+        return {
+            "availability_topic": f"{device.base_topic}/state",
+            "availability_template": "{{ value_json.power }}",
+            "payload_available": "ON",
+            "payload_not_available": "OFF",
+        }
+    return {
+        "availability_topic": f"{device.base_topic}/state/power",
+        "payload_available": "ON",
+        "payload_not_available": "OFF",
+    }
+
+def build_discovery_configs(device):
+    """Topic and payload of every Home Assistant discovery config of device."""
+    base_topic = device.base_topic
+    node_id = device.node_id
+    unique_identifier = device.unique_identifier
+    configs = []
+
+    configs.append((f"homeassistant/switch/{node_id}/power/config",
         json.dumps({
-            "name": "Epson Projector Power",
-            "unique_id": f"{EPSON_UNIQUE_IDENTIFIER}_pwr",
-            "command_topic": f"{BASE_TOPIC}/command/power", 
-            "state_topic": f"{BASE_TOPIC}/state/power"
+            "name": f"{device.name_prefix}Epson Projector Power",
+            "unique_id": f"{unique_identifier}_pwr",
+            "command_topic": f"{base_topic}/command/power",
+            **state_config(device, "power"),
         })
-    )
+    ))
 
     for key_name, config in EPSON_CONFIG_RANGES.items():
-        await publish_message(client, f"homeassistant/number/{BASE_TOPIC}/{key_name.lower()}/config", 
+        configs.append((f"homeassistant/number/{node_id}/{key_name.lower()}/config",
             json.dumps({
-                "name": f"{config['human_name']}", 
-                "unique_id": f"{EPSON_UNIQUE_IDENTIFIER}_{key_name.lower()}",
-                "command_topic": f"{BASE_TOPIC}/command/{key_name}", 
-                "state_topic": f"{BASE_TOPIC}/state/{key_name}",
+                "name": f"{device.name_prefix}{config['human_name']}",
+                "unique_id": f"{unique_identifier}_{key_name.lower()}",
+                "command_topic": f"{base_topic}/command/{key_name}",
+                **state_config(device, key_name),
                 "min": min(config['humanized_range']),
                 "max": max(config['humanized_range']),
                 "step": (1,5)[config['value_translator'] == '50-100'],
                 "unit_of_measurement": ('','%')[config['value_translator'] == '50-100'],
-                "availability_topic": f"{BASE_TOPIC}/state/power",
-                "payload_available": "ON",
-                "payload_not_available": "OFF",
+                **availability_config(device),
             })
-        )
-    
+        ))
+
     for key_name, config in EPSON_OPTIONS.items():
-        await publish_message(client, f"homeassistant/select/{BASE_TOPIC}/{key_name.lower()}/config", 
+        configs.append((f"homeassistant/select/{node_id}/{key_name.lower()}/config",
             json.dumps({
-                "name": f"{config['human_name']}", 
-                "unique_id": f"{EPSON_UNIQUE_IDENTIFIER}_{key_name.lower()}",
-                "command_topic": f"{BASE_TOPIC}/command/{key_name}", 
-                "state_topic": f"{BASE_TOPIC}/state/{key_name}",
+                "name": f"{device.name_prefix}{config['human_name']}",
+                "unique_id": f"{unique_identifier}_{key_name.lower()}",
+                "command_topic": f"{base_topic}/command/{key_name}",
+                **state_config(device, key_name),
                 "options": [
                     x[0] for x in config['options']
                 ],
-                "availability_topic": f"{BASE_TOPIC}/state/power",
-                "payload_available": "ON",
-                "payload_not_available": "OFF",
+                **availability_config(device),
             })
-        )
-    
+        ))
+
     for i in range(1,11):
-        await publish_message(client, f"homeassistant/button/{BASE_TOPIC}/lens_memory_{i}/config", 
+        configs.append((f"homeassistant/button/{node_id}/lens_memory_{i}/config",
             json.dumps({
-                "name": f"Load Lens Memory #{i}", 
-                "unique_id": f"{EPSON_UNIQUE_IDENTIFIER}_lens_memory_{i}",
-                "command_topic": f"{BASE_TOPIC}/command/LENS_MEMORY_{i}",
-                "availability_topic": f"{BASE_TOPIC}/state/power",
-                "payload_available": "ON",
-                "payload_not_available": "OFF",
+                "name": f"{device.name_prefix}Load Lens Memory #{i}",
+                "unique_id": f"{unique_identifier}_lens_memory_{i}",
+                "command_topic": f"{base_topic}/command/LENS_MEMORY_{i}",
+                **availability_config(device),
             })
-        )
+        ))
 
-        await publish_message(client, f"homeassistant/button/{BASE_TOPIC}/image_memory_{i}/config", 
+        configs.append((f"homeassistant/button/{node_id}/image_memory_{i}/config",
             json.dumps({
-                "name": f"Load Image Memory #{i}", 
-                "unique_id": f"{EPSON_UNIQUE_IDENTIFIER}_image_memory_{i}",
-                "command_topic": f"{BASE_TOPIC}/command/MEMORY_{i}", 
-                "availability_topic": f"{BASE_TOPIC}/state/power",
-                "payload_available": "ON",
-                "payload_not_available": "OFF",
+                "name": f"{device.name_prefix}Load Image Memory #{i}",
+                "unique_id": f"{unique_identifier}_image_memory_{i}",
+                "command_topic": f"{base_topic}/command/MEMORY_{i}",
+                **availability_config(device),
             })
-        )
-        
+        ))
+
+    configs.append((f"homeassistant/binary_sensor/{node_id}/lens_moving/config",
+        json.dumps({
+            "name": f"{device.name_prefix}Epson Projector Lens Moving",
+            "unique_id": f"{unique_identifier}_lens_moving",
+            **state_config(device, "lens_moving"),
+            **availability_config(device),
+        })
+    ))
+
     for key_name, config in EPSON_READOUTS.items():
-        await publish_message(client, f"homeassistant/sensor/{BASE_TOPIC}/{key_name.lower()}/config", 
+        configs.append((f"homeassistant/sensor/{node_id}/{key_name.lower()}/config",
             json.dumps({
-                "name": f"{config['human_name']}", 
-                "unique_id": f"{EPSON_UNIQUE_IDENTIFIER}_{key_name.lower()}",
-                "state_topic": f"{BASE_TOPIC}/state/{key_name}",
-                "availability_topic": f"{BASE_TOPIC}/state/power",
-                "payload_available": "ON",
-                "payload_not_available": "OFF",
+                "name": f"{device.name_prefix}{config['human_name']}",
+                "unique_id": f"{unique_identifier}_{key_name.lower()}",
+                **state_config(device, key_name),
+                **availability_config(device),
             })
-        )
+        ))
+    return configs
+
+def discovery_configs(device):
+    """Discovery configs of device, built again only when its unique identifier changes."""
+    unique_identifier = device.unique_identifier
+    if device.discovery is None or device.discovery[0] != unique_identifier:
+        configs = build_discovery_configs(device)
+        digest = hashlib.sha256(json.dumps(configs).encode()).hexdigest()
+        device.discovery = (unique_identifier, configs, digest)
+    return device.discovery[1], device.discovery[2]
+
+async def read_retained(client, topic, timeout=DISCOVERY_DIGEST_TIMEOUT):
+    """Payload the broker retains on topic, None if nothing arrives within timeout."""
+    async with client.filtered_messages(topic) as messages:
+        await client.subscribe(topic)
+        try:
+            message = await asyncio.wait_for(messages.__anext__(), timeout)
+            return message.payload.decode()
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            await client.unsubscribe(topic)
+
+async def publish_homeassistant_discovery_config(device, client):
+    """
+    Publish discovery configs concurrently, unless the broker already holds them.
+
+    A digest of the configs is retained next to them, a reconnect finding
+    the same digest skips publishing them again.
+    """
+    configs, digest = discovery_configs(device)
+    digest_topic = f"{device.base_topic}/discovery_digest"
+    if await read_retained(client, digest_topic) == digest:
+        _LOGGER.info("Discovery configs of %s are unchanged, skipping them", device.name)
+        return
+
+    in_flight = asyncio.Semaphore(DISCOVERY_IN_FLIGHT)
+
+    async def publish(topic, payload):
+        async with in_flight:
+            await publish_message(client, topic, payload)
+
+    await asyncio.gather(*(publish(topic, payload) for topic, payload in configs))
+    # Only vouch for configs which all made it to the broker
+    await publish_message(client, digest_topic, digest)
 
 async def cancel_tasks(tasks):
     for task in tasks:
@@ -242,16 +683,36 @@ async def cancel_tasks(tasks):
             pass
 
 async def main():
+    # Projector connections outlive MQTT reconnects, so they are set up once here.
+    # Bounds how many projectors are polled at once, and how long an unreachable one may hold its slot
+    poll_slots = asyncio.Semaphore(POLL_CONCURRENCY)
+    devices = parse_devices(EPSON_IP, IdentityCache(IDENTITY_CACHE_PATH), poll_slots)
+    # Writes and lens moves can outlast a session, so they publish into one queue kept across reconnects
+    outbox = PublishQueue()
+    # Referenced for the lifetime of main so the task isn't garbage collected
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    if METRICS_PORT:
+        await start_metrics_server('0.0.0.0', METRICS_PORT)
+
     # Run the epson_projector_bridge indefinitely. Reconnect automatically
     # if the connection is lost.
     reconnect_interval = 3  # [seconds]
     while True:
         try:
-            await epson_projector_bridge()
+            await epson_projector_bridge(devices, outbox)
         except MqttError as error:
-            print(f'Error "{error}". Reconnecting in {reconnect_interval} seconds.')
+            _LOGGER.error('Error "%s". Reconnecting in %s seconds.', error, reconnect_interval)
         finally:
             await asyncio.sleep(reconnect_interval)
 
 
-asyncio.run(main(), debug=True)
\ No newline at end of file
+if __name__ == "__main__":
+    if not MQTT_HOST or not EPSON_IP:
+        raise Exception('Missing environment config! Please make sure MQTT_HOST and EPSON_IP environment variables are set.')
+
+    logging.basicConfig(
+        level=LOG_LEVEL,
+        format="%(asctime)s - [%(threadName)s] - %(name)s - %(levelname)s - %(message)s",
+    )
+    # asyncio debug mode slows every callback down, only pay for it when debugging
+    asyncio.run(main(), debug=LOG_LEVEL == 'DEBUG')
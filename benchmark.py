@@ -0,0 +1,248 @@
+"""
+Benchmarks of the projector transport and MQTT bridge hot paths.
+
+Runs against a local ProjectorSimulator and, when MQTT_HOST is set (or
+--mqtt-host given), a local MQTT broker. Results are printed as JSON so they
+can be stored and compared across releases, e.g.
+
+    python benchmark.py --latency 0.02 > bench_output.txt
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import time
+
+from epson_projector.const import (
+    EPSON_CONFIG_RANGES,
+    EPSON_OPTIONS,
+    EPSON_READOUTS,
+    POWER,
+    PWR_ON_STATE,
+)
+from epson_projector.registry import translate_to_epson
+from epson_projector.simulator import ProjectorSimulator
+from epson_projector.version import __version__
+
+# Seconds an MQTT command may take to come through before it is counted as lost
+MQTT_TIMEOUT = 10
+
+
+def summarize(latencies, duration=None):
+    """Latency percentiles in milliseconds."""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    if not count:
+        return {"count": 0}
+
+    def percentile(fraction):
+        return round(latencies[min(int(count * fraction), count - 1)] * 1000, 3)
+
+    summary = {
+        "count": count,
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+        "mean_ms": round(sum(latencies) / count * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+    if duration:
+        summary["per_second"] = round(count / duration, 1)
+    return summary
+
+
+async def timed(request):
+    """Seconds request took."""
+    start = time.perf_counter()
+    await request()
+    return time.perf_counter() - start
+
+
+class DiscardingClient:
+    """MQTT client stand-in measuring the projector side of the bridge only."""
+
+    async def publish(self, topic, payload, retain=False):
+        pass
+
+
+async def bench_get_property(projector, iterations):
+    return summarize([
+        await timed(lambda: projector.get_property(POWER)) for _ in range(iterations)
+    ])
+
+
+async def bench_send_config_value(projector, iterations):
+    return summarize([
+        await timed(lambda: projector.send_config_value('BRIGHTNESS', i % 101))
+        for i in range(iterations)
+    ])
+
+
+async def bench_full_refresh(bridge, device, iterations):
+    keys = [*EPSON_CONFIG_RANGES, *EPSON_READOUTS, *EPSON_OPTIONS]
+    client = DiscardingClient()
+    return summarize([
+        await timed(lambda: bridge.get_all_config_values(client, device, keys))
+        for _ in range(iterations)
+    ])
+
+
+async def bench_throughput(projector, duration, concurrency):
+    """Commands per second with several concurrent callers."""
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def caller(index):
+        while time.perf_counter() < deadline:
+            if index % 2:
+                latencies.append(await timed(lambda: projector.get_property('BRIGHT')))
+            else:
+                latencies.append(await timed(lambda: projector.send_config_value('CONTRAST', 50)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(index) for index in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def bench_command_during_poll(bridge, device, iterations):
+    """Latency of user commands while full state polls run back to back."""
+    keys = [*EPSON_CONFIG_RANGES, *EPSON_READOUTS, *EPSON_OPTIONS]
+    client = DiscardingClient()
+
+    async def poll_forever():
+        while True:
+            await bridge.get_all_config_values(client, device, keys)
+
+    poller = asyncio.create_task(poll_forever())
+    try:
+        latencies = []
+        for i in range(iterations):
+            await asyncio.sleep(0.01)
+            latencies.append(await timed(
+                lambda: device.projector.send_config_value('BRIGHTNESS', i % 101)
+            ))
+        return summarize(latencies)
+    finally:
+        poller.cancel()
+
+
+async def bench_mqtt_end_to_end(bridge, simulator, mqtt_host, iterations):
+    """
+    Time from publishing a command on MQTT to its state being published, and
+    to the value being written to the projector.
+
+    The bridge publishes commanded values before writing them, so the first
+    is the broker round trip and the second includes the debounce and the
+    projector I/O. A command not seen through within MQTT_TIMEOUT ends the
+    run, its messages can't be told from the next command's anymore.
+    """
+    from asyncio_mqtt import Client
+
+    bridge.MQTT_HOST = mqtt_host
+    devices = bridge.parse_devices(f"{simulator.host}:{simulator.port}")
+    device = devices[0]
+    state_topic = f"{device.base_topic}/state/BRIGHTNESS"
+    translator = EPSON_CONFIG_RANGES['BRIGHTNESS']['value_translator']
+    bridge_task = asyncio.create_task(
+        bridge.epson_projector_bridge(devices)
+    )
+
+    async def published(messages, value):
+        async for message in messages:
+            if message.payload.decode() == value:
+                return
+
+    async def written(raw):
+        while simulator.state['BRIGHT'] != raw:
+            await asyncio.sleep(0.001)
+
+    published_latencies = []
+    written_latencies = []
+    timed_out = False
+    try:
+        async with Client(mqtt_host) as client:
+            async with client.filtered_messages(state_topic) as messages:
+                await client.subscribe(state_topic)
+                for i in range(iterations):
+                    # Never the initial 50, an unchanged value is not published again
+                    value = str(i % 50)
+                    raw = str(translate_to_epson(value, translator))
+                    start = time.perf_counter()
+                    await client.publish(f"{device.base_topic}/command/BRIGHTNESS", value)
+                    try:
+                        await asyncio.wait_for(published(messages, value), MQTT_TIMEOUT)
+                        published_latencies.append(time.perf_counter() - start)
+                        await asyncio.wait_for(written(raw), MQTT_TIMEOUT)
+                        written_latencies.append(time.perf_counter() - start)
+                    except asyncio.TimeoutError:
+                        timed_out = True
+                        break
+    finally:
+        bridge_task.cancel()
+        device.projector.close()
+    return {
+        "published": summarize(published_latencies),
+        "written": summarize(written_latencies),
+        "timed_out": timed_out,
+    }
+
+
+async def run(args):
+    import asyncio_mqtt_based_client as bridge
+
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "simulated_latency_s": args.latency,
+        "simulated_jitter_s": args.jitter,
+    }
+    async with ProjectorSimulator(
+        port=0, serial_port=0, power=PWR_ON_STATE, latency=args.latency, jitter=args.jitter, seed=1
+    ) as simulator:
+        device = bridge.EpsonDevice(simulator.host, port=simulator.port)
+        projector = device.projector
+        await projector.get_power()
+
+        results["get_property"] = await bench_get_property(projector, args.iterations)
+        results["send_config_value"] = await bench_send_config_value(projector, args.iterations)
+        results["full_refresh"] = await bench_full_refresh(bridge, device, max(args.iterations // 10, 1))
+        results["throughput"] = await bench_throughput(projector, args.duration, args.concurrency)
+        results["command_during_poll"] = await bench_command_during_poll(
+            bridge, device, max(args.iterations // 10, 1)
+        )
+        projector.close()
+
+        if args.mqtt_host:
+            results["mqtt_end_to_end"] = await bench_mqtt_end_to_end(
+                bridge, simulator, args.mqtt_host, max(args.iterations // 10, 1)
+            )
+        else:
+            results["mqtt_end_to_end"] = None
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5, help="seconds of the throughput run")
+    parser.add_argument("--concurrency", type=int, default=4, help="callers in the throughput run")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated projector latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="simulated projector jitter in seconds")
+    parser.add_argument("--mqtt-host", default=os.environ.get('MQTT_HOST'))
+    parser.add_argument("--output", help="file to write JSON results to instead of stdout")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Circuit breaker for connections to Epson projector."""
+import random
+import time
+
+from .const import BREAKER_THRESHOLD, RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY
+
+
+class CircuitBreaker:
+    """
+    Fail fast while projector is unreachable.
+
+    After threshold consecutive failed connection attempts the breaker opens
+    and no attempt is made until the backoff delay passed. The delay doubles
+    with every further failure up to max_delay and is jittered so several
+    clients don't retry in lockstep. A successful attempt closes it again.
+    """
+
+    def __init__(
+        self,
+        threshold=BREAKER_THRESHOLD,
+        base_delay=RECONNECT_BASE_DELAY,
+        max_delay=RECONNECT_MAX_DELAY,
+    ):
+        """
+        Init closed circuit breaker.
+
+        :param int threshold:       Failures before attempts are held back
+        :param float base_delay:    Seconds to wait after first held back failure
+        :param float max_delay:     Upper bound of the wait
+        """
+        self._threshold = threshold
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._failures = 0
+        self._retry_at = 0
+
+    @property
+    def is_open(self):
+        """True while attempts are held back."""
+        return time.monotonic() < self._retry_at
+
+    def retry_in(self):
+        """Seconds until next attempt is allowed."""
+        return max(self._retry_at - time.monotonic(), 0)
+
+    def record_success(self):
+        """Close breaker after successful attempt."""
+        self._failures = 0
+        self._retry_at = 0
+
+    def record_failure(self):
+        """Count failed attempt, opening breaker once threshold is reached."""
+        self._failures += 1
+        if self._failures >= self._threshold:
+            delay = min(
+                self._base_delay * 2 ** (self._failures - self._threshold), self._max_delay
+            )
+            self._retry_at = time.monotonic() + delay * random.uniform(0.5, 1)
@@ -0,0 +1,71 @@
+"""State cache of Epson projector module."""
+import time
+
+from .const import (
+    POWER,
+    CACHE_TTLS,
+    DEFAULT_CACHE_TTL,
+    EPSON_CONFIG_RANGES,
+    EPSON_READOUTS,
+    EPSON_OPTIONS,
+    STATE_DEPENDENCIES,
+)
+
+
+def _epson_code(key):
+    """Epson code queried for a property name."""
+    entry = EPSON_CONFIG_RANGES.get(key) or EPSON_READOUTS.get(key)
+    if entry:
+        return entry['epson_code']
+    if key in EPSON_OPTIONS:
+        return EPSON_OPTIONS[key]['epson_command']
+    return key
+
+
+class StateCache:
+    """
+    Values read from the projector, keyed by epson code.
+
+    A value is served until its TTL runs out or a command which may change
+    it is sent (see STATE_DEPENDENCIES). Changing power drops everything.
+    """
+
+    def __init__(self, ttls=CACHE_TTLS, default_ttl=DEFAULT_CACHE_TTL):
+        """
+        Init empty cache.
+
+        :param dict ttls:           Epson code to seconds its value stays valid
+        :param float default_ttl:   TTL of codes missing in ttls
+        """
+        self._ttls = ttls
+        self._default_ttl = default_ttl
+        self._values = {}
+        self._dependencies = {
+            code: {_epson_code(key) for key in keys}
+            for code, keys in STATE_DEPENDENCIES.items()
+        }
+
+    def get(self, code):
+        """Return cached value of code, None if unknown or expired."""
+        value, expires = self._values.get(code, (None, 0))
+        if expires < time.monotonic():
+            return None
+        return value
+
+    def set(self, code, value):
+        """Store value read for code."""
+        ttl = self._ttls.get(code, self._default_ttl)
+        self._values[code] = (value, time.monotonic() + ttl)
+
+    def invalidate(self, code):
+        """Drop values which a command with given epson code may change."""
+        if code == POWER:
+            self._values.clear()
+            return
+        self._values.pop(code, None)
+        for dependent in self._dependencies.get(code, ()):
+            self._values.pop(dependent, None)
+
+    def clear(self):
+        """Drop all cached values."""
+        self._values.clear()
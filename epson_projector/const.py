@@ -8,6 +8,7 @@ HTTP_OK = 200
 TCP_PORT = 3629
 TCP_SERIAL_PORT = 3620
 HTTP_PORT = 80
+SERIAL_BAUDRATE = 9600
 EEMP0100 = "45454d5030313030"
 SERIAL_COMMAND = "0000000002000000"
 SERIAL_BYTE = bytearray.fromhex(f"{EEMP0100}{SERIAL_COMMAND}")
@@ -23,6 +24,10 @@ ESCVPNAME = "ESC/VP"
 ERROR = "ERR"
 PWR_ON_STATE = "01"
 PWR_OFF_STATE = "04"
+PWR_WARMING_STATE = "02"
+PWR_COOLING_STATE = "03"
+PWR_STANDBY_STATE = "00"
+PWR_ABNORMAL_STATE = "05"
 ESCVP_HELLO_COMMAND = "\r"
 COLON = ":"
 CR = "\r"
@@ -306,8 +311,73 @@ EPSON_OPTIONS = {
     },
 }
 
+# Seconds between polls of each property while its value keeps changing.
+POLL_INTERVALS = {
+    POWER: 10,
+    **{key: 15 for key in EPSON_CONFIG_RANGES},
+    **{key: 15 for key in EPSON_OPTIONS},
+    **{key: 60 for key in EPSON_READOUTS},
+}
+# Stable properties back off up to this many times their interval.
+POLL_BACKOFF_LIMIT = 8
+POLL_BURST_INTERVAL = 1
+POLL_BURST_DURATION = 10
+# Seconds one poll round of a projector may take before it is abandoned.
+POLL_TIMEOUT = 15
+
+# Seconds between samples of the lens readouts while the lens moves, e.g. after a POPLP recall.
+LENS_SAMPLE_INTERVAL = 0.5
+# Samples in a row without change after which the lens is considered settled.
+LENS_STABLE_SAMPLES = 3
+LENS_SETTLE_TIMEOUT = 60
+
+PICTURE_SETTINGS = [
+    *EPSON_CONFIG_RANGES,
+    "COLOR_SPACE",
+    "HDR_DYNAMIC_RANGE",
+    "IMGPROC",
+]
+
+# Properties whose value may change when a command with given epson code is sent.
+STATE_DEPENDENCIES = {
+    "CMODE": PICTURE_SETTINGS,
+    "POPMEM": ["CMODE", *PICTURE_SETTINGS],
+    "POPLP": list(EPSON_READOUTS),
+    "FOCUS": ["FOCUS"],
+}
+
+# Seconds a value read from the projector may be served from cache.
+CACHE_TTLS = {POWER: 2, **{entry['epson_code']: 30 for entry in EPSON_READOUTS.values()}}
+DEFAULT_CACHE_TTL = 5
+
+DEFAULT_IDENTITY_CACHE_PATH = "~/.cache/epson_projector/identity.json"
 
 DEFAULT_TIMEOUT_TIME = 1
+CONNECT_TIMEOUT = 10
+# Consecutive request timeouts after which the connection is considered dead.
+MAX_REQUEST_TIMEOUTS = 2
+BREAKER_THRESHOLD = 1
+RECONNECT_BASE_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+KEEPALIVE_INTERVAL = 30
+KEEPALIVE_TIMEOUT = 5
+MAX_IN_FLIGHT = 4
+# Upper bounds in seconds of latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+EVENT_LOOP_LAG_INTERVAL = 1
+HTTP_CONNECTIONS_PER_HOST = 2
+
+PRIORITY_USER = 0
+PRIORITY_POLL = 10
+# Seconds a request may wait in the queue, long enough for user commands to outlive PWR ON warm-up.
+QUEUE_TIMEOUTS = {PRIORITY_USER: 60, PRIORITY_POLL: 10}
+# Seconds between PWR? probes while projector warms up or cools down
+BUSY_POLL_INTERVAL = 1
+# Bounds in seconds of timeouts learned from observed latency, static timeouts above the ceiling are kept
+ADAPTIVE_TIMEOUT_FLOOR = 0.5
+ADAPTIVE_TIMEOUT_CEILING = 10
+# Replies seen before a command's learned timeout replaces its static one
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 5
 TIMEOUT_TIMES = {"PWR ON": 40, "PWR OFF": 10, "SOURCE": 5, "ALL": 1}
 
 DEFAULT_SOURCES = {
@@ -0,0 +1,113 @@
+"""Prompt-delimited response framing for ESC/VP streams."""
+import asyncio
+import collections
+import logging
+
+from .const import COLON, CR, ERROR
+
+_LOGGER = logging.getLogger(__name__)
+
+PROMPT = COLON.encode()
+FRAME_STRIP = CR + "\n\x00 "
+
+
+class ResponseFramer:
+    """
+    Split an ESC/VP byte stream into replies and hand them to requests.
+
+    Every reply of the projector ends with the ``:`` prompt. Queries
+    (``CMD?``) are answered with ``CMD=value``, set commands with an empty
+    frame and rejected requests with ``ERR``. Replies come in the order the
+    requests were sent, so a timed out request stays queued as a placeholder
+    which swallows its late reply instead of handing it to the next request.
+    A placeholder is given up once another request's reply arrives, as its
+    own reply was lost. Frames nobody is waiting for (late replies,
+    unsolicited events) are dropped.
+    """
+
+    def __init__(self, on_error=None, on_orphan=None):
+        """
+        Init empty buffer and queue of outstanding requests.
+
+        :param on_error:    Called with the command of every request answered ERR
+        :param on_orphan:   Called with every discarded frame
+        """
+        self._buffer = bytearray()
+        self._pending = collections.deque()
+        self._on_error = on_error
+        self._on_orphan = on_orphan
+
+    def expect(self, response_key=None, command=None):
+        """
+        Register an outstanding request and return future for its reply.
+
+        :param str response_key:    Command of a query (``PWR`` for ``PWR?``),
+                                    None for commands answered by bare prompt.
+        :param str command:         Code of the request passed to on_error, response_key if None
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((response_key, future, command or response_key))
+        return future
+
+    def feed(self, data):
+        """Consume bytes read from the stream and dispatch complete frames."""
+        self._buffer.extend(data)
+        while True:
+            index = self._buffer.find(PROMPT)
+            if index == -1:
+                return
+            frame = bytes(self._buffer[:index])
+            del self._buffer[: index + 1]
+            self._dispatch(frame.decode(errors="replace").strip(FRAME_STRIP))
+
+    def fail_all(self, exc):
+        """Fail every outstanding request, e.g. when connection is lost."""
+        self._buffer.clear()
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(exc)
+
+    def _dispatch(self, frame):
+        """Resolve the request a single frame belongs to, the oldest outstanding one."""
+        while self._pending and self._pending[0][1].done():
+            response_key, _, _ = self._pending[0]
+            if frame == ERROR or self._answers(response_key, frame):
+                # Replies come in order, so this is the late reply of a timed out request.
+                self._pending.popleft()
+                self._discard(frame)
+                return
+            # Reply of the timed out request was lost, the frame is for a later one.
+            self._pending.popleft()
+
+        if not self._pending:
+            self._discard(frame)
+            return
+
+        response_key, future, command = self._pending[0]
+        if frame == ERROR:
+            self._pending.popleft()
+            if self._on_error:
+                self._on_error(command)
+            future.set_exception(
+                Exception(f"Projector returned {ERROR} for {response_key or 'command'}")
+            )
+        elif self._answers(response_key, frame):
+            self._pending.popleft()
+            future.set_result(frame[len(response_key) + 1:] if response_key else frame)
+        else:
+            # Not a reply to the request in turn, e.g. an unsolicited event.
+            self._discard(frame)
+
+    @staticmethod
+    def _answers(response_key, frame):
+        """True if frame is the reply a request with response_key waits for."""
+        if response_key is None:
+            return not frame
+        return frame.startswith(f"{response_key}=")
+
+    def _discard(self, frame):
+        """Drop frame nobody is waiting for."""
+        _LOGGER.debug("Discarding orphan frame %r", frame)
+        if self._on_orphan:
+            self._on_orphan(frame)
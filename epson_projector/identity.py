@@ -0,0 +1,54 @@
+"""On-disk cache of Epson projector identities."""
+import json
+import logging
+import os
+
+from .const import DEFAULT_IDENTITY_CACHE_PATH
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IdentityCache:
+    """
+    Identity of projectors (serial number, supported features, learned
+    latency profile) keyed by host.
+
+    Serial number can only be asked while the projector is on, so it is
+    remembered on disk and known right away on the next start even if the
+    projector is in standby by then.
+    """
+
+    def __init__(self, path=DEFAULT_IDENTITY_CACHE_PATH):
+        """
+        Init cache, loading it from path if it exists.
+
+        :param str path:    JSON file the cache is stored in
+        """
+        self._path = os.path.expanduser(path)
+        self._identities = {}
+        try:
+            with open(self._path) as fh:
+                self._identities = json.load(fh)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Ignoring unreadable identity cache %s: %s", self._path, err)
+
+    def get(self, host):
+        """Return identity known for host, empty dict if none."""
+        return dict(self._identities.get(host, {}))
+
+    def update(self, host, **identity):
+        """Merge identity values of host and store cache on disk."""
+        known = self._identities.setdefault(host, {})
+        if all(known.get(key) == value for key, value in identity.items()):
+            return
+        known.update(identity)
+        try:
+            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+            temp_path = f"{self._path}.tmp"
+            with open(temp_path, "w") as fh:
+                json.dump(self._identities, fh, indent=2, sort_keys=True)
+            os.replace(temp_path, self._path)
+        except OSError as err:
+            _LOGGER.warning("Cannot store identity cache %s: %s", self._path, err)
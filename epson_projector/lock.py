@@ -1,7 +1,16 @@
-"""Lock to prevent sending multiple command at once to Epson projector."""
+"""Lock tracking when Epson projector is too busy to take requests."""
 
 import time
-from .const import (TURN_ON, TURN_OFF, INV_SOURCES, SOURCE, ALL, TIMEOUT_TIMES)
+from .const import (
+    TURN_ON, TURN_OFF, INV_SOURCES, SOURCE, ALL, TIMEOUT_TIMES,
+    PWR_ON_STATE, PWR_OFF_STATE, PWR_STANDBY_STATE, PWR_ABNORMAL_STATE,
+)
+
+# PWR? states ending the busy time of a power command, TIMEOUT_TIMES is only the upper bound.
+READY_STATES = {
+    TURN_ON: (PWR_ON_STATE, PWR_ABNORMAL_STATE),
+    TURN_OFF: (PWR_OFF_STATE, PWR_STANDBY_STATE, PWR_ABNORMAL_STATE),
+}
 
 
 class Lock:
@@ -20,7 +29,7 @@ class Lock:
         else:
             self._operation = ALL
         self._isLocked = True
-        self._timer = time.time()
+        self._timer = time.monotonic()
 
     def __unlock(self):
         """Unlock sending requests to projector."""
@@ -36,8 +45,30 @@ class Lock:
         passed so requests can be unlocked.
         """
         if self._isLocked:
-            if (time.time() - self._timer) > TIMEOUT_TIMES[self._operation]:
+            if (time.monotonic() - self._timer) > TIMEOUT_TIMES[self._operation]:
                 self.__unlock()
                 return False
             return True
         return False
+
+    @property
+    def awaits_power_state(self):
+        """True while busy with a power command which PWR? tells the end of."""
+        return self.checkLock() and self._operation in READY_STATES
+
+    def update_power_state(self, state):
+        """
+        Unlock as soon as projector reports the state a power command leads to.
+
+        Returns True if that released the lock.
+        """
+        if self.awaits_power_state and state in READY_STATES[self._operation]:
+            self.__unlock()
+            return True
+        return False
+
+    def time_remaining(self):
+        """Seconds until projector can take requests again, 0 if it can now."""
+        if self.checkLock():
+            return TIMEOUT_TIMES[self._operation] - (time.monotonic() - self._timer)
+        return 0
@@ -0,0 +1,173 @@
+"""Lightweight metrics of Epson projector module."""
+import asyncio
+import bisect
+import logging
+import time
+
+from .const import EVENT_LOOP_LAG_INTERVAL, LATENCY_BUCKETS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum and max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of values."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3),
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """
+    Counters, gauges and histograms keyed by name and labels.
+
+    Recording is a dict lookup and an addition, so it is cheap enough for
+    every request. Read them with snapshot() or render_prometheus().
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(self._buckets)
+        histogram.observe(value)
+
+    def clear(self):
+        self._counters.clear()
+        self._gauges.clear()
+        self._histograms.clear()
+
+    def snapshot(self, **match):
+        """
+        Dict of series name to value, for series carrying all given labels.
+
+        Matched labels are left out of the series names, histograms are
+        summarized in milliseconds.
+        """
+        def series(key):
+            name, labels = key
+            if any(dict(labels).get(label) != value for label, value in match.items()):
+                return None
+            rest = ",".join(f"{label}={value}" for label, value in labels if label not in match)
+            return f"{name}{{{rest}}}" if rest else name
+
+        result = {}
+        for values in (self._counters, self._gauges):
+            for key, value in values.items():
+                name = series(key)
+                if name is not None:
+                    result[name] = value
+        for key, histogram in self._histograms.items():
+            name = series(key)
+            if name is not None:
+                result[name] = histogram.summary()
+        return result
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        def labels_text(labels, extra=()):
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            escaped = (
+                (label, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                for label, value in pairs
+            )
+            return "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+        lines = []
+        for kind, values in (("counter", self._counters), ("gauge", self._gauges)):
+            typed = set()
+            for (name, labels), value in sorted(values.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} {kind}")
+                    typed.add(name)
+                lines.append(f"{name}{labels_text(labels)} {value}")
+        typed = set()
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{labels_text(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{labels_text(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{labels_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by all projectors of the process, series carry a host label.
+METRICS = Metrics()
+
+
+async def monitor_event_loop_lag(metrics=METRICS, interval=EVENT_LOOP_LAG_INTERVAL):
+    """Record how late the event loop wakes a sleeping task, until cancelled."""
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lag = max(time.monotonic() - start - interval, 0)
+        metrics.observe("epson_event_loop_lag_seconds", lag)
+        metrics.set("epson_event_loop_lag_last_seconds", lag)
+
+
+async def start_metrics_server(host, port, metrics=METRICS):
+    """Serve metrics for Prometheus on http://host:port/metrics, returns runner to clean up."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _LOGGER.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return runner
@@ -0,0 +1,143 @@
+"""Adaptive per-property polling schedule of Epson projector module."""
+import time
+
+from .const import (
+    POWER,
+    POLL_INTERVALS,
+    POLL_BACKOFF_LIMIT,
+    POLL_BURST_INTERVAL,
+    POLL_BURST_DURATION,
+    STATE_DEPENDENCIES,
+)
+
+
+def related_properties(epson_code):
+    """Properties which may change after a command with given epson code."""
+    return STATE_DEPENDENCIES.get(epson_code, [])
+
+
+class _Property:
+    """Polling state of one property."""
+
+    def __init__(self, interval):
+        self.base_interval = interval
+        self.interval = interval
+        self.next_due = 0
+        self.value = None
+        self.burst_until = 0
+
+
+class PollScheduler:
+    """
+    Decide which properties are due to be polled.
+
+    Every property has its own interval. A poll returning an unchanged value
+    doubles the interval, up to backoff_limit times the base one, and a change
+    resets it. burst() polls properties every POLL_BURST_INTERVAL for a while,
+    e.g. after a command touching them. In standby only power is polled, as a
+    heartbeat which is never backed off.
+    """
+
+    def __init__(
+        self,
+        intervals=POLL_INTERVALS,
+        backoff_limit=POLL_BACKOFF_LIMIT,
+        burst_interval=POLL_BURST_INTERVAL,
+    ):
+        """
+        Init polling schedule, every property is due immediately.
+
+        :param dict intervals:      Property to base poll interval in seconds
+        :param int backoff_limit:   Max factor stable intervals grow to
+        :param float burst_interval: Poll interval during a burst
+        """
+        self._properties = {key: _Property(interval) for key, interval in intervals.items()}
+        self._backoff_limit = backoff_limit
+        self._burst_interval = burst_interval
+        self.standby = False
+
+    def __contains__(self, key):
+        return key in self._properties
+
+    def add(self, key, interval):
+        """Start polling property, due immediately unless it is polled already."""
+        if key not in self._properties:
+            self._properties[key] = _Property(interval)
+
+    def remove(self, key):
+        """Stop polling property."""
+        self._properties.pop(key, None)
+
+    def due(self, now=None):
+        """List properties which should be polled now."""
+        now = time.monotonic() if now is None else now
+        return [key for key in self._active() if self._properties[key].next_due <= now]
+
+    def time_until_due(self, now=None):
+        """Seconds until the next property is due."""
+        now = time.monotonic() if now is None else now
+        next_due = min(self._properties[key].next_due for key in self._active())
+        return max(next_due - now, 0)
+
+    def record(self, key, value, now=None):
+        """Record polled value and schedule next poll. Returns True if it changed."""
+        now = time.monotonic() if now is None else now
+        prop = self._properties[key]
+        changed = value != prop.value
+        prop.value = value
+        if changed or key == POWER:
+            prop.interval = prop.base_interval
+        else:
+            prop.interval = min(prop.interval * 2, prop.base_interval * self._backoff_limit)
+        self._schedule(prop, now)
+        return changed
+
+    def record_error(self, key, now=None):
+        """Schedule failed poll for retry at base interval."""
+        now = time.monotonic() if now is None else now
+        prop = self._properties[key]
+        prop.interval = prop.base_interval
+        self._schedule(prop, now)
+
+    def burst(self, keys, duration=POLL_BURST_DURATION, now=None):
+        """Poll given properties at burst interval for duration seconds."""
+        now = time.monotonic() if now is None else now
+        for key in keys:
+            prop = self._properties.get(key)
+            if prop is None:
+                continue
+            prop.burst_until = now + duration
+            prop.interval = prop.base_interval
+            prop.next_due = min(prop.next_due, now)
+
+    def end_burst(self, keys, now=None):
+        """Return given properties to their own interval, e.g. once what the burst waited for is over."""
+        now = time.monotonic() if now is None else now
+        for key in keys:
+            prop = self._properties.get(key)
+            if prop is None:
+                continue
+            prop.burst_until = 0
+            prop.next_due = now + prop.interval
+
+    def set_standby(self, standby):
+        """Switch between power-only heartbeat and full polling."""
+        if self.standby and not standby:
+            # Everything may have changed while projector was off.
+            for prop in self._properties.values():
+                prop.interval = prop.base_interval
+                prop.next_due = 0
+        self.standby = standby
+
+    def _active(self):
+        """Properties polled in current power state."""
+        if self.standby:
+            return [POWER]
+        return self._properties.keys()
+
+    def _schedule(self, prop, now):
+        """Set next due time of polled property."""
+        if now < prop.burst_until:
+            prop.next_due = now + self._burst_interval
+        else:
+            prop.next_due = now + prop.interval
@@ -1,23 +1,27 @@
 """Main of Epson projector module."""
-from .const import BUSY, TCP_PORT, HTTP_PORT, POWER, HTTP, TCP, SERIAL, EPSON_CONFIG_RANGES, EPSON_READOUTS
-from .timeout import get_timeout
+from .const import (
+    BUSY, TCP_PORT, TCP_SERIAL_PORT, HTTP_PORT, POWER, HTTP, TCP, SERIAL, EPSON_CONFIG_RANGES, EPSON_READOUTS,
+    EPSON_OPTIONS, PRIORITY_USER, PRIORITY_POLL, POLL_INTERVALS, POLL_TIMEOUT, STATE_DEPENDENCIES,
+    LENS_SAMPLE_INTERVAL, LENS_STABLE_SAMPLES, LENS_SETTLE_TIMEOUT, MAX_IN_FLIGHT,
+)
+from .registry import (
+    KEY_COMMAND_CODES, KEY_COMMANDS, OPTION_COMMANDS, OPTION_NAMES, OPTION_RAW_VALUES,
+    translate_from_epson, translate_to_epson,
+)
+from .timeout import AdaptiveTimeouts
 
+from .cache import StateCache
 from .lock import Lock
+from .scheduler import RequestScheduler
+from .watch import PropertyWatch
 
+import asyncio
 import logging
+import time
 
 
 _LOGGER = logging.getLogger(__name__)
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(
-    logging.Formatter("%(asctime)s - %(name)s     - %(levelname)s - %(message)s")
-)
-_LOGGER.addHandler(console_handler)
-_LOGGER.setLevel(logging.DEBUG)
-
-# logging.basicConfig(level=logging.DEBUG)
-
 
 class Projector:
     """
@@ -32,6 +36,13 @@ class Projector:
         websession=None,
         type=TCP,
         timeout_scale=1.0,
+        use_cache=False,
+        port=None,
+        serial_port=TCP_SERIAL_PORT,
+        identity_cache=None,
+        poll_intervals=POLL_INTERVALS,
+        poll_slots=None,
+        poll_timeout=POLL_TIMEOUT,
     ):
         """
         Epson Projector controller.
@@ -39,82 +50,265 @@ class Projector:
         :param str host:        Hostname/IP/serial to the projector
         :param obj websession:  Websession to pass for HTTP protocol
         :param timeout_scale    Factor to multiply default timeouts by (for slow projectors)
+        :param bool use_cache:  Serve recently read values from memory, see StateCache
+        :param int port:        Port of ESC/VP.net protocol, or of web interface for HTTP
+        :param int serial_port: Port the serial number is asked on
+        :param obj identity_cache: IdentityCache remembering serial number and learned
+                                   timeouts across restarts
+        :param dict poll_intervals: Property to base poll interval of watch() in seconds
+        :param obj poll_slots:  Semaphore bounding how many projectors watch() polls at once
+        :param float poll_timeout: Seconds one poll round of watch() may take
 
         """
         self._lock = Lock()
+        self._scheduler = RequestScheduler(self._lock, host, probe=self._probe_power)
         self._type = type
         self._timeout_scale = timeout_scale
         self._power = None
-
-        from .projector_tcp import ProjectorTcp
+        self._cache = StateCache() if use_cache else None
+        self._identity_cache = identity_cache
+        self._timeouts = AdaptiveTimeouts(
+            timeout_scale,
+            profile=identity_cache.get(host).get("timeouts") if identity_cache else None,
+        )
 
         self._host = host
-        self._projector = ProjectorTcp(host, TCP_PORT)
+        if type == HTTP:
+            from .projector_http import ProjectorHttp
+
+            self._projector = ProjectorHttp(host, websession, port or HTTP_PORT, serial_port)
+        elif type == SERIAL:
+            from .projector_serial import ProjectorSerial
+
+            self._projector = ProjectorSerial(host)
+        else:
+            from .projector_tcp import ProjectorTcp
+
+            self._projector = ProjectorTcp(host, port or TCP_PORT, serial_port)
+        self._projector.latency_tracker = self._timeouts
+        self._watch = PropertyWatch(self, host, poll_intervals, poll_slots, poll_timeout)
 
     def close(self):
-        """Close connection. Not used in HTTP"""
-        self._projector.close()
+        """
+        Close connection.
+
+        Returns awaitable finishing the close where it takes I/O (HTTP), None otherwise.
+        """
+        self._scheduler.close()
+        return self._projector.close()
 
     def set_timeout_scale(self, timeout_scale=1.0):
         self._timeout_scale = timeout_scale
-    
-    def translate_value_to_epson(self, value, value_translator_setting):
-        if value_translator_setting == '21':
-            return int(int(value) * 256/21)
-        
-        if value_translator_setting == '50-100':
-            return int((int(value) - 50) / 5) * 25
+        self._timeouts.timeout_scale = timeout_scale
 
-        if value_translator_setting == '100':
-            return int(int(value) * 256/101)
+    def get_timeout(self, command):
+        """Timeout in seconds for command, learned from latency of earlier replies."""
+        return self._timeouts.get(command)
 
-        return int(value)
+    def save_timeout_profile(self):
+        """Store learned latencies in identity cache, so timeouts start from them next time."""
+        if self._identity_cache:
+            self._identity_cache.update(self._host, timeouts=self._timeouts.profile())
 
-    def translate_value_from_epson(self, value, value_translator_setting):
-        if value_translator_setting == '50-100':
-            return int(int(value) / 25 * 5 + 50)
-        
-        if value_translator_setting == '21':
-            return round(int(value) * 21/256)
-        
-        if value_translator_setting == '100':
-            return round(int(value) * 101/256)
+    def _drop_cached(self, *epson_codes):
+        """Drop cached values of given codes, so they are read from the projector next time."""
+        if self._cache:
+            for code in epson_codes:
+                self._cache.invalidate(code)
 
-        return value
+    def _invalidate(self, *epson_codes):
+        """Drop cached values which commands with given codes may change, and re-poll watched ones."""
+        self._drop_cached(*epson_codes)
+        self._watch.burst(epson_codes)
 
-    async def get_serial_number(self):
-        return await self._projector.get_serial()
+    def watch(self, properties):
+        """
+        Async generator of changes to properties, polled in the background.
+
+        Yields dict of property to value: the known values first, then only
+        the ones that changed. All watchers of a projector share one poll
+        stream, see PropertyWatch.
+
+            async for changes in projector.watch([POWER, "BRIGHTNESS"]):
+                ...
 
-    async def get_power(self):
+        :param properties:  Keys of EPSON_CONFIG_RANGES, EPSON_READOUTS,
+                            EPSON_OPTIONS or PWR
+        """
+        return self._watch.watch(properties)
+    
+    def translate_value_to_epson(self, value, value_translator_setting):
+        return translate_to_epson(value, value_translator_setting)
+
+    def translate_value_from_epson(self, value, value_translator_setting):
+        return translate_from_epson(value, value_translator_setting)
+
+    @property
+    def identity(self):
+        """Identity of projector known without asking it, see identify()."""
+        if self._identity_cache:
+            return self._identity_cache.get(self._host)
+        return {}
+
+    async def get_serial_number(self, priority=PRIORITY_USER):
+        serial = self.identity.get("serial")
+        if serial:
+            return serial
+
+        serial = await self._scheduler.submit(self._projector.get_serial, priority=priority)
+        if serial and self._identity_cache:
+            self._identity_cache.update(self._host, serial=serial)
+        return serial
+
+    async def identify(self, priority=PRIORITY_POLL):
+        """
+        Learn serial number and supported features of projector.
+
+        Projector has to be on. Features are the config, readout and option
+        names it answers without ERR. Result is stored in identity cache.
+        Features are learned even if the serial number can't be read.
+        """
+        try:
+            serial = await self.get_serial_number(priority=priority)
+        except Exception as err:
+            _LOGGER.warning("Reading serial number of %s failed: %r", self._host, err)
+            serial = None
+        codes = {
+            **{key: entry['epson_code'] for key, entry in EPSON_CONFIG_RANGES.items()},
+            **{key: entry['epson_code'] for key, entry in EPSON_READOUTS.items()},
+            **{key: entry['epson_command'] for key, entry in EPSON_OPTIONS.items()},
+        }
+        values = await self.get_properties(list(codes.values()), priority=priority)
+        identity = {}
+        if serial:
+            identity["serial"] = serial
+        # A timed out query says nothing about support, only ERR does.
+        if not any(isinstance(value, asyncio.TimeoutError) for value in values.values()):
+            identity["features"] = [
+                key for key, code in codes.items() if not isinstance(values[code], Exception)
+            ]
+        if self._identity_cache:
+            self._identity_cache.update(self._host, **identity)
+        return identity
+
+    async def get_power(self, priority=PRIORITY_USER):
         """Get Power info."""
         _LOGGER.debug("Getting POWER info")
-        power = await self.get_property(command=POWER)
+        power = await self.get_property(command=POWER, priority=priority)
         if power:
             self._power = power
         return self._power
 
-    async def get_property(self, command, timeout=None):
-        """Get property state from device."""
+    async def _probe_power(self):
+        """PWR? state, sent right away for the scheduler while it waits for a power command."""
+        power = await self._projector.get_property(
+            command=POWER, timeout=self.get_timeout(POWER)
+        )
+        self._power = power
+        if self._cache:
+            self._cache.set(POWER, power)
+        return power
+
+    async def get_property(self, command, timeout=None, priority=PRIORITY_USER, deadline=None):
+        """
+        Get property state from device.
+
+        :param str command:     Property to query, e.g. PWR
+        :param float timeout:   Seconds to wait for the reply once sent
+        :param int priority:    Queue priority, see PRIORITY_* consts
+        :param float deadline:  Seconds the request may wait in the queue
+        """
+        if self._cache:
+            value = self._cache.get(command)
+            if value is not None:
+                return value
+
         _LOGGER.debug("Getting property %s", command)
-        timeout = timeout if timeout else get_timeout(command, self._timeout_scale)
-        if self._lock.checkLock():
-            raise Exception("Cannot fetch value as connection is locked")
+        timeout = timeout if timeout else self.get_timeout(command)
 
-        return await self._projector.get_property(command=command, timeout=timeout)
+        value = await self._scheduler.submit(
+            lambda: self._projector.get_property(command=command, timeout=timeout),
+            priority=priority,
+            deadline=deadline,
+        )
+        if self._cache:
+            self._cache.set(command, value)
+        return value
 
-    async def send_command(self, command):
-        """Send command to Epson."""
-        _LOGGER.debug("Sending command to projector %s", command)
+    @staticmethod
+    async def _batch(request, commands, max_in_flight=MAX_IN_FLIGHT):
+        """
+        Run request(command) for every command, max_in_flight at a time.
+
+        Stream connections pipeline the requests in flight, HTTP sends them
+        on concurrent connections. Returns dict of command to result, or to
+        the exception raised for it.
+        """
+        commands = list(dict.fromkeys(commands))
+        in_flight = asyncio.Semaphore(max_in_flight)
 
-        if self._lock.checkLock():
-            raise Exception("Projector is busy!")
+        async def run(command):
+            async with in_flight:
+                return await request(command)
 
-        self._lock.setLock(command)
-        return await self._projector.send_command(
-            command, get_timeout(command, self._timeout_scale)
+        results = await asyncio.gather(
+            *(run(command) for command in commands), return_exceptions=True
         )
+        return dict(zip(commands, results))
 
-    async def read_config_value(self, config, timeout=None):
+    async def get_properties(self, commands, timeout=None, priority=PRIORITY_USER, deadline=None):
+        """
+        Get several property states from device in one pipelined batch.
+
+        Returns dict of command to value. A command that failed maps to
+        the exception raised for it instead of failing the whole batch.
+        """
+        values = {}
+        if self._cache:
+            for command in commands:
+                value = self._cache.get(command)
+                if value is not None:
+                    values[command] = value
+        missing = [command for command in commands if command not in values]
+        if not missing:
+            return {command: values[command] for command in commands}
+
+        _LOGGER.debug("Getting properties %s", missing)
+        timeout = timeout if timeout else max(
+            self.get_timeout(command) for command in missing
+        )
+
+        fetched = await self._scheduler.submit(
+            lambda: self._batch(
+                lambda command: self._projector.get_property(command=command, timeout=timeout),
+                missing,
+            ),
+            priority=priority,
+            deadline=deadline,
+        )
+        for command, value in fetched.items():
+            if self._cache and not isinstance(value, Exception):
+                self._cache.set(command, value)
+            values[command] = value
+        return {command: values[command] for command in commands}
+
+    async def send_command(self, command, priority=PRIORITY_USER, deadline=None):
+        """Send command to Epson."""
+        _LOGGER.debug("Sending command to projector %s", command)
+
+        try:
+            return await self._scheduler.submit(
+                lambda: self._projector.send_command(
+                    command, self.get_timeout(command)
+                ),
+                priority=priority,
+                deadline=deadline,
+                busy_command=command,
+            )
+        finally:
+            self._invalidate(*KEY_COMMAND_CODES.get(command, ()))
+
+    async def read_config_value(self, config, timeout=None, priority=PRIORITY_USER, deadline=None):
         """Read a config value from Epson."""
         if config in EPSON_CONFIG_RANGES:
             entry = EPSON_CONFIG_RANGES[config]
@@ -126,22 +320,56 @@ class Projector:
         command = entry['epson_code']
         value_translator_setting = entry['value_translator']
 
-        _LOGGER.debug("Getting property %s", command)
+        value = await self.get_property(
+            command=command, timeout=timeout, priority=priority, deadline=deadline
+        )
 
-        timeout = timeout if timeout else get_timeout(command, self._timeout_scale)
-        if self._lock.checkLock():
-            raise Exception("Cannot fetch value as connection is locked")
+        return self.translate_value_from_epson(value, value_translator_setting)
 
-        value = await self._projector.get_property(command=command, timeout=timeout)
+    async def read_config_values(self, configs, timeout=None, priority=PRIORITY_USER, deadline=None):
+        """
+        Read several config values from Epson in one pipelined batch.
 
-        return self.translate_value_from_epson(value, value_translator_setting)
-        
+        Returns dict of config to translated value, or to the exception
+        raised for it.
+        """
+        results = {}
+        entries = {}
+        for config in configs:
+            entry = EPSON_CONFIG_RANGES.get(config) or EPSON_READOUTS.get(config)
+            if entry is None:
+                results[config] = Exception(f"Error!!! Trying to read {config} is not accepted!")
+            else:
+                entries[config] = entry
+        if not entries:
+            return results
+
+        values = await self.get_properties(
+            [entry['epson_code'] for entry in entries.values()],
+            timeout=timeout,
+            priority=priority,
+            deadline=deadline,
+        )
+        for config, entry in entries.items():
+            value = values[entry['epson_code']]
+            if not isinstance(value, Exception):
+                try:
+                    value = self.translate_value_from_epson(value, entry['value_translator'])
+                except ValueError as err:
+                    value = err
+            results[config] = value
+        return results
+
+    def config_value_command(self, config, value):
+        """
+        Request setting config to humanized value, e.g. BRIGHT 101.
 
-    async def send_config_value(self, config, value):
-        """Send a config value to Epson."""
+        Raises if config or value is not accepted, so values can be checked
+        before anything is sent.
+        """
         if config not in EPSON_CONFIG_RANGES:
             raise Exception(f"Error!!! Trying to set {config} is not accepted!")
-            
+
         base_comand = EPSON_CONFIG_RANGES[config]['epson_code']
         possible_range = EPSON_CONFIG_RANGES[config]['valid_range']
         value_translator_setting = EPSON_CONFIG_RANGES[config]['value_translator']
@@ -150,21 +378,197 @@ class Projector:
 
         if value not in possible_range:
             raise Exception(f"Error!!! Translated value {value} is not accepted in possible range for {config}!")
-            
-        command = f"{base_comand} {value}"
 
-        _LOGGER.debug("Sending config value to projector %s", command)
-        if self._lock.checkLock():
-            raise Exception("Projector is busy!")
+        return f"{base_comand} {value}"
 
-        # self._lock.setLock(command)
-        return await self._projector.send_request(
-            command=command, 
-            timeout=get_timeout(command, self._timeout_scale)
-        )
+    async def send_config_value(self, config, value, priority=PRIORITY_USER, deadline=None):
+        """Send a config value to Epson."""
+        command = self.config_value_command(config, value)
+        base_comand = EPSON_CONFIG_RANGES[config]['epson_code']
+
+        _LOGGER.debug("Sending config value to projector %s", command)
 
-    async def send_request(self, command):
-        if self._lock.checkLock():
-            raise Exception("Projector is busy!")
+        try:
+            return await self._scheduler.submit(
+                lambda: self._projector.send_request(
+                    command=command,
+                    timeout=self.get_timeout(command)
+                ),
+                priority=priority,
+                deadline=deadline,
+            )
+        finally:
+            self._invalidate(base_comand)
+
+    async def send_request(self, command, priority=PRIORITY_USER, deadline=None):
+        try:
+            return await self._scheduler.submit(
+                lambda: self._projector.send_request(command=command, timeout=10),
+                priority=priority,
+                deadline=deadline,
+            )
+        finally:
+            self._invalidate(command.split(" ")[0].rstrip("?"))
+
+    def _profile_writes(self, profile):
+        """
+        Validate profile, returning key to (epson code, request, raw value expected back).
 
-        return await self._projector.send_request(params=command, timeout=10)
+        Raises one exception naming every invalid entry, so nothing is sent
+        for a profile that can only be applied in part.
+        """
+        features = self.identity.get("features")
+        writes = {}
+        problems = []
+        for key, value in profile.items():
+            if features is not None and key not in features and key in (*EPSON_CONFIG_RANGES, *EPSON_OPTIONS):
+                problems.append(f"{key} is not supported by projector")
+            elif key in EPSON_CONFIG_RANGES:
+                entry = EPSON_CONFIG_RANGES[key]
+                try:
+                    raw = self.translate_value_to_epson(value, entry['value_translator'])
+                except (TypeError, ValueError):
+                    raw = None
+                if raw not in entry['valid_range']:
+                    problems.append(f"{value} is not accepted for {key}")
+                    continue
+                writes[key] = (entry['epson_code'], f"{entry['epson_code']} {raw}", str(raw))
+            elif key in EPSON_OPTIONS:
+                command = OPTION_COMMANDS[key].get(value)
+                if command is None:
+                    problems.append(f"{value} is not an option of {key}")
+                    continue
+                code = EPSON_OPTIONS[key]['epson_command']
+                writes[key] = (code, KEY_COMMANDS[command], OPTION_RAW_VALUES[key][value])
+            else:
+                problems.append(f"{key} is not a config value or option")
+        if problems:
+            raise Exception(f"Error!!! Profile is not accepted: {'; '.join(problems)}")
+        return writes
+
+    async def apply_profile(self, profile, priority=PRIORITY_USER, deadline=None):
+        """
+        Apply several config values and options at once, e.g. a "movie night" setup.
+
+        Everything is validated before anything is sent. Writes which change
+        other settings (e.g. the color mode) go first, one by one, the rest
+        is pipelined after them. All values are then read back in one batch.
+        Returns dict of key to outcome: "status" is "applied", "mismatch"
+        (read back differs), "failed" (projector refused it), "skipped"
+        (an earlier write failed) or "unverified" (read back failed), with
+        the "value" read back or the "error".
+
+        :param dict profile:    Key of EPSON_CONFIG_RANGES to humanized value,
+                                key of EPSON_OPTIONS to option name
+        """
+        writes = self._profile_writes(profile)
+        leading = [key for key, write in writes.items() if write[0] in STATE_DEPENDENCIES]
+        batches = [*([key] for key in leading), [key for key in writes if key not in leading]]
+
+        async def send():
+            replies = {}
+            for batch in batches:
+                if not batch or any(isinstance(reply, Exception) for reply in replies.values()):
+                    continue
+                commands = [writes[key][1] for key in batch]
+                timeout = max(self.get_timeout(command) for command in commands)
+                replies.update(await self._batch(
+                    lambda command: self._projector.send_request(command=command, timeout=timeout),
+                    commands,
+                ))
+            return replies
+
+        _LOGGER.debug("Applying profile %s", profile)
+        try:
+            replies = await self._scheduler.submit(send, priority=priority, deadline=deadline)
+        finally:
+            self._invalidate(*(write[0] for write in writes.values()))
+
+        codes = [write[0] for key, write in writes.items() if write[1] in replies]
+        values = await self.get_properties(codes, priority=priority, deadline=deadline) if codes else {}
+
+        report = {}
+        for key, (code, command, expected) in writes.items():
+            if command not in replies:
+                report[key] = {"status": "skipped"}
+            elif isinstance(replies[command], Exception):
+                report[key] = {"status": "failed", "error": str(replies[command])}
+            elif isinstance(values[code], Exception):
+                report[key] = {"status": "unverified", "error": str(values[code])}
+            else:
+                raw = values[code]
+                if key in EPSON_OPTIONS:
+                    value = OPTION_NAMES[key].get(raw, raw)
+                elif raw.isdigit():
+                    raw = str(int(raw))
+                    translator = EPSON_CONFIG_RANGES[key]['value_translator']
+                    # Untranslated values come back as strings, ints like watch() yields
+                    value = int(self.translate_value_from_epson(raw, translator))
+                else:
+                    value = raw
+                report[key] = {"status": "applied" if raw == expected else "mismatch", "value": value}
+        return report
+
+    async def lens_positions(
+        self,
+        timeout=LENS_SETTLE_TIMEOUT,
+        interval=LENS_SAMPLE_INTERVAL,
+        stable_samples=LENS_STABLE_SAMPLES,
+        priority=PRIORITY_USER,
+    ):
+        """
+        Async generator of lens readouts while the lens moves, e.g. after a LENS_MEMORY recall.
+
+        Samples EPSON_READOUTS every interval seconds and yields dict of
+        readout to position whenever they changed, the first sample included.
+        Ends once stable_samples samples in a row came back unchanged, raises
+        asyncio.TimeoutError if the lens did not settle within timeout.
+        Samples are handed to watch() as well, which does not poll the
+        readouts itself meanwhile; they go back to their own poll interval
+        once sampling ends.
+
+        :param float timeout:       Seconds the lens may take to settle
+        :param float interval:      Seconds between samples
+        :param int stable_samples:  Unchanged samples in a row meaning the lens stopped
+        """
+        readouts = list(EPSON_READOUTS)
+        codes = [EPSON_READOUTS[key]['epson_code'] for key in readouts]
+        deadline = time.monotonic() + timeout
+        positions = None
+        stable = 0
+        self._watch.hold(readouts)
+        try:
+            while stable < stable_samples:
+                if time.monotonic() >= deadline:
+                    raise asyncio.TimeoutError(f"Lens did not settle within {timeout}s")
+                self._drop_cached(*codes)
+                values = await self.read_config_values(readouts, priority=priority)
+                if any(isinstance(value, Exception) for value in values.values()):
+                    # Tells nothing about motion, e.g. a projector busy moving the lens
+                    _LOGGER.debug("Sampling lens failed: %s", values)
+                else:
+                    sample = {key: int(value) for key, value in values.items()}
+                    self._watch.record(sample)
+                    if sample == positions:
+                        stable += 1
+                    else:
+                        positions = sample
+                        stable = 0
+                        yield sample
+                if stable < stable_samples:
+                    await asyncio.sleep(interval)
+        finally:
+            self._watch.release(readouts)
+
+    async def wait_lens_settled(
+        self,
+        timeout=LENS_SETTLE_TIMEOUT,
+        interval=LENS_SAMPLE_INTERVAL,
+        stable_samples=LENS_STABLE_SAMPLES,
+        priority=PRIORITY_USER,
+    ):
+        """Wait until the lens stopped moving and return its positions, see lens_positions()."""
+        positions = None
+        async for positions in self.lens_positions(timeout, interval, stable_samples, priority):
+            pass
+        return positions
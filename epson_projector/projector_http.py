@@ -0,0 +1,151 @@
+"""HTTP connection of Epson projector module."""
+import logging
+import time
+
+import aiohttp
+import asyncio
+import async_timeout
+
+from .const import (
+    ACCEPT_ENCODING,
+    ACCEPT_HEADER,
+    ERROR,
+    HTTP_CONNECTIONS_PER_HOST,
+    HTTP_OK,
+    HTTP_PORT,
+    JSON_QUERY,
+    TCP_SERIAL_PORT,
+)
+from .metrics import METRICS
+from .projector_tcp import query_serial_number
+from .registry import KEY_COMMANDS
+from .timeout import timeout_key
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ProjectorHttp:
+    """
+    Epson HTTP connector
+
+    Sends ESC/VP commands through the web control interface
+    (``/cgi-bin/json_query?jsoncallback=CMD?``). Connections are kept alive
+    in a shared aiohttp session, at most connections_per_host at a time.
+    """
+
+    def __init__(
+        self,
+        host,
+        websession=None,
+        port=HTTP_PORT,
+        serial_port=TCP_SERIAL_PORT,
+        connections_per_host=HTTP_CONNECTIONS_PER_HOST,
+    ):
+        """
+        Epson HTTP connector
+
+        :param str host:                IP address of Projector
+        :param obj websession:          aiohttp ClientSession to share, own one is made if None
+        :param int port:                Port of web interface. Default 80.
+        :param int serial_port:         Port to ask for serial number on. Default 3620.
+        :param int connections_per_host: Max concurrent requests to projector
+        """
+        self._host = host
+        self._serial_port = serial_port
+        self._serial = None
+        self._url = f"http://{host}:{port}/cgi-bin/{JSON_QUERY}"
+        self._headers = {
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Accept": ACCEPT_HEADER,
+            "Referer": f"http://{host}:{port}/cgi-bin/webconf",
+        }
+        self._session = websession
+        self._own_session = websession is None
+        # Task closing own session, kept until it is done
+        self._closing = None
+        self._connections_per_host = connections_per_host
+        self._connections = asyncio.Semaphore(connections_per_host)
+        # AdaptiveTimeouts learning from the latency of every reply, if set
+        self.latency_tracker = None
+
+    def close(self):
+        """
+        Close own session, a shared one is left to its owner.
+
+        Returns task closing the session, None if there is nothing to close.
+        """
+        if self._own_session and self._session and not self._session.closed:
+            self._closing = asyncio.ensure_future(self._session.close())
+            self._session = None
+        return self._closing
+
+    def _get_session(self):
+        """Session to send requests with, created on first use."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self._connections_per_host)
+            )
+        return self._session
+
+    async def get_property(self, command, timeout):
+        """Get property state from device."""
+        _LOGGER.debug("Sending request %s", command)
+        response = await self._request(timeout=timeout, command=f"{command}?", key=command)
+        # Web interface answers with the bare value, some firmwares echo CMD= like ESC/VP.net.
+        resp_beginning = f"{command}="
+        if response.startswith(resp_beginning):
+            return response[len(resp_beginning):]
+        return response
+
+    async def send_command(self, command, timeout):
+        """Send command to Epson."""
+        return await self._request(timeout=timeout, command=KEY_COMMANDS[command], key=command)
+
+    async def send_request(self, timeout, command):
+        """Send HTTP request to Epson."""
+        return await self._request(timeout=timeout, command=command, key=timeout_key(command))
+
+    async def _request(self, timeout, command, key):
+        """
+        Send one ESC/VP command through json_query and return its reply.
+
+        :param str key:     Key of the request in metrics and latency_tracker
+        """
+        _LOGGER.debug("Sending command %r", command)
+        start = time.monotonic()
+        try:
+            async with self._connections:
+                async with async_timeout.timeout(timeout):
+                    async with self._get_session().get(
+                        self._url, params={"jsoncallback": command}, headers=self._headers
+                    ) as response:
+                        if response.status != HTTP_OK:
+                            raise Exception(f"Error message {response.status} from Epson")
+                        data = await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            METRICS.inc("epson_request_timeouts_total", host=self._host, command=key)
+            if self.latency_tracker:
+                self.latency_tracker.record_timeout(key, timeout)
+            raise
+        except aiohttp.ClientError as err:
+            raise Exception(f"Cannot connect to Epson: {err}") from err
+        finally:
+            latency = time.monotonic() - start
+            METRICS.observe("epson_request_seconds", latency, host=self._host, command=key)
+        if self.latency_tracker:
+            self.latency_tracker.record(key, latency)
+
+        try:
+            reply = data["projector"]["feature"]["reply"]
+        except (KeyError, TypeError):
+            raise Exception(f"Unexpected response to {command}: {data}")
+        if reply == ERROR:
+            METRICS.inc("epson_err_replies_total", host=self._host, command=key)
+            raise Exception(f"Projector returned {ERROR} for {command}")
+        return reply
+
+    async def get_serial(self):
+        """Ask projector for its serial number on serial_port, remembered once known."""
+        if not self._serial:
+            self._serial = await query_serial_number(self, self._host, self._serial_port)
+        return self._serial
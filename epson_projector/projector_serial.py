@@ -0,0 +1,71 @@
+"""Serial (RS-232) connection of Epson projector module."""
+import logging
+
+import asyncio
+import async_timeout
+import serial_asyncio
+
+from .const import (
+    COLON,
+    CONNECT_TIMEOUT,
+    EPSON_CODES,
+    ESCVP_HELLO_COMMAND,
+    POWER,
+    SERIAL_BAUDRATE,
+    SNO,
+)
+from .projector_stream import ProjectorStream
+from .timeout import get_timeout
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ProjectorSerial(ProjectorStream):
+    """
+    Epson serial connector
+
+    Speaks plain ESC/VP21 over RS-232, with the same framing, pipelining and
+    reconnect handling as the TCP connector.
+    """
+
+    # A serial line does not go half-open, nothing to probe.
+    keepalive_interval = None
+
+    def __init__(self, port, baudrate=SERIAL_BAUDRATE):
+        """
+        Epson serial connector
+
+        :param str port:        Serial device (e.g. /dev/ttyUSB0) or pyserial URL
+        :param int baudrate:    Baud rate set on the projector. Default 9600.
+        """
+        super().__init__(port)
+        self._port = port
+        self._baudrate = baudrate
+
+    async def _open_stream(self):
+        """Open serial port and wait until projector answers an empty command."""
+        self._reader, self._writer = await serial_asyncio.open_serial_connection(
+            url=self._port, baudrate=self._baudrate
+        )
+        # Bare CR flushes whatever the projector buffered, it answers with a colon when ready.
+        self._writer.write(ESCVP_HELLO_COMMAND.encode())
+        await self._reader.readuntil(COLON.encode())
+        return True
+
+    async def get_serial(self):
+        """Ask projector for its serial number, there is no serial number port on RS-232."""
+        if not self._serial:
+            try:
+                async with async_timeout.timeout(CONNECT_TIMEOUT):
+                    power_on = await self.get_property(POWER, get_timeout(POWER))
+                    if power_on == EPSON_CODES[POWER]:
+                        self._serial = await self.get_property(SNO, get_timeout(SNO))
+                    else:
+                        _LOGGER.error("Is projector turned on?")
+            except asyncio.TimeoutError:
+                _LOGGER.error(
+                    "Timeout error receiving SERIAL of projector. Is projector turned on?"
+                )
+            except Exception as err:
+                _LOGGER.error("Projector did not report its serial number: %s", err)
+        return self._serial
@@ -0,0 +1,235 @@
+"""Stream connection of Epson projector module, shared by TCP and serial."""
+import logging
+import time
+
+import asyncio
+import async_timeout
+
+from .const import (
+    CONNECT_TIMEOUT,
+    CR,
+    MAX_REQUEST_TIMEOUTS,
+    KEEPALIVE_INTERVAL,
+    KEEPALIVE_TIMEOUT,
+    ESCVP_HELLO_COMMAND,
+)
+from .breaker import CircuitBreaker
+from .framer import ResponseFramer
+from .metrics import METRICS
+from .registry import KEY_COMMAND_PAYLOADS, query_payload
+from .timeout import timeout_key
+
+_LOGGER = logging.getLogger(__name__)
+
+ESCVP_HELLO_PAYLOAD = ESCVP_HELLO_COMMAND.encode()
+
+
+class ProjectorStream:
+    """
+    Base of connectors speaking ESC/VP over a byte stream.
+
+    Subclasses open the stream in _open_stream(). Replies are read by a
+    background task and matched to requests by ResponseFramer, so requests
+    can be pipelined. A broken stream is reopened by the next request, with
+    a circuit breaker failing fast while the projector is unreachable.
+    """
+
+    # Seconds of idle time after which the connection is probed, None disables probing.
+    keepalive_interval = KEEPALIVE_INTERVAL
+
+    def __init__(self, host):
+        """
+        Init connection state, stream is opened by the first request.
+
+        :param str host:    Address of projector, labels its metrics
+        """
+        self._host = host
+        self._isOpen = False
+        self._serial = None
+        self._reader = None
+        self._writer = None
+        self._framer = ResponseFramer(
+            on_error=lambda command: METRICS.inc(
+                "epson_err_replies_total", host=self._host, command=command
+            ),
+            on_orphan=lambda frame: METRICS.inc("epson_orphan_replies_total", host=self._host),
+        )
+        self._reader_task = None
+        self._keepalive_task = None
+        self._open_lock = asyncio.Lock()
+        self._breaker = CircuitBreaker()
+        self._timeouts = 0
+        self._last_activity = 0
+        self._connected_before = False
+        # AdaptiveTimeouts learning from the latency of every reply, if set
+        self.latency_tracker = None
+
+    async def _open_stream(self):
+        """Open stream into self._reader and self._writer, return True on success."""
+        raise NotImplementedError
+
+    async def async_init(self):
+        """Async init to open connection with projector."""
+        _LOGGER.debug("Executing async init")
+        try:
+            async with async_timeout.timeout(CONNECT_TIMEOUT):
+                if not await self._open_stream():
+                    _LOGGER.info("Cannot open connection to Epson")
+                    if self._writer:
+                        self._writer.close()
+                    return
+        except asyncio.TimeoutError:
+            _LOGGER.error("Timeout error")
+            return
+        except asyncio.IncompleteReadError:
+            _LOGGER.error("Connection closed during handshake")
+            return
+        except ConnectionRefusedError:
+            _LOGGER.error("Connection refused Error")
+            return
+        except OSError as err:
+            _LOGGER.error("No route to host? %s", err)
+            return
+
+        self._isOpen = True
+        self._timeouts = 0
+        self._last_activity = time.monotonic()
+        self._reader_task = asyncio.create_task(self._read_frames())
+        if self.keepalive_interval:
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+        _LOGGER.info("Connection open")
+
+    def close(self):
+        self._drop_connection("Connection closed")
+
+    def _drop_connection(self, reason):
+        """Tear down connection, next request opens a new one."""
+        if not self._isOpen:
+            return
+        _LOGGER.info("Dropping connection: %s", reason)
+        METRICS.inc("epson_disconnects_total", host=self._host)
+        self._isOpen = False
+        for task in (self._reader_task, self._keepalive_task):
+            if task and task is not asyncio.current_task():
+                task.cancel()
+        self._writer.close()
+        self._framer.fail_all(Exception(reason))
+
+    async def _read_frames(self):
+        """Feed everything the projector sends into the response framer."""
+        while True:
+            try:
+                data = await self._reader.read(256)
+            except OSError as err:
+                _LOGGER.error("Connection lost: %s", err)
+                data = b""
+            if not data:
+                self._drop_connection("Connection lost")
+                return
+            self._last_activity = time.monotonic()
+            self._framer.feed(data)
+
+    async def _keepalive(self):
+        """Probe idle connection so a half-open socket is noticed before it is used."""
+        while True:
+            idle = time.monotonic() - self._last_activity
+            if idle < self.keepalive_interval:
+                await asyncio.sleep(self.keepalive_interval - idle)
+                continue
+            try:
+                await self._request(
+                    timeout=KEEPALIVE_TIMEOUT, payload=ESCVP_HELLO_PAYLOAD, command="hello"
+                )
+            except Exception as err:
+                _LOGGER.warning("Keepalive probe failed: %s", err)
+                self._drop_connection("Keepalive probe failed")
+                return
+
+    async def get_property(self, command, timeout):
+        """Get property state from device."""
+        _LOGGER.debug("Sending request %s", command)
+        response = await self._request(
+            timeout=timeout, payload=query_payload(command), response_key=command
+        )
+        _LOGGER.debug("Response to command %s is %s", command, response)
+        return response
+
+    async def send_command(self, command, timeout):
+        """Send command to Epson."""
+        _LOGGER.debug("Prepping command %s", command)
+
+        # if command == "PWR OFF":
+        #     # need to send it twice...
+        #     await self.send_request(timeout=timeout, command=formatted_command)
+
+        response = await self._request(
+            timeout=timeout, payload=KEY_COMMAND_PAYLOADS[command], command=command
+        )
+        return response
+
+    async def send_request(self, timeout, command):
+        """Send request to Epson."""
+        return await self._request(
+            timeout=timeout, payload=(command + CR).encode(), command=timeout_key(command)
+        )
+
+    async def _connect(self):
+        """Open connection unless it is open, failing fast while projector is unreachable."""
+        async with self._open_lock:
+            if self._isOpen:
+                return
+            if self._breaker.is_open:
+                raise Exception(
+                    f"Projector unreachable, next attempt in {self._breaker.retry_in():.1f}s"
+                )
+            await self.async_init()
+            if not self._isOpen:
+                self._breaker.record_failure()
+                METRICS.inc("epson_connect_failures_total", host=self._host)
+                raise Exception("Cannot open connection to Epson")
+            self._breaker.record_success()
+            METRICS.inc("epson_connects_total", host=self._host)
+            if self._connected_before:
+                METRICS.inc("epson_reconnects_total", host=self._host)
+            self._connected_before = True
+
+    async def _request(self, timeout, payload, response_key=None, command=None):
+        """
+        Write payload bytes and wait until the prompt of its reply arrives.
+
+        :param str response_key:    Command a query reply starts with, see ResponseFramer.expect
+        :param str command:         Key of the request in metrics and latency_tracker,
+                                    response_key if None
+        """
+        if self._isOpen and self._writer.is_closing():
+            self._drop_connection("Connection lost")
+        if self._isOpen is False:
+            await self._connect()
+        _LOGGER.debug("Sending command %r", payload)
+        command = command or response_key
+        future = self._framer.expect(response_key, command)
+        start = self._last_activity = time.monotonic()
+        try:
+            self._writer.write(payload)
+        except (OSError, RuntimeError) as err:
+            self._drop_connection(f"Write failed: {err}")
+        try:
+            async with async_timeout.timeout(timeout):
+                response = await future
+        except asyncio.TimeoutError:
+            METRICS.inc("epson_request_timeouts_total", host=self._host, command=command)
+            if self.latency_tracker:
+                self.latency_tracker.record_timeout(command, timeout)
+            self._timeouts += 1
+            if self._timeouts >= MAX_REQUEST_TIMEOUTS:
+                _LOGGER.warning("%d requests in a row timed out, reconnecting", self._timeouts)
+                self._drop_connection("Connection stopped responding")
+            raise
+        finally:
+            latency = time.monotonic() - start
+            METRICS.observe("epson_request_seconds", latency, host=self._host, command=command)
+        if self.latency_tracker:
+            self.latency_tracker.record(command, latency)
+        self._timeouts = 0
+        return response
+
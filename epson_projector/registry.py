@@ -0,0 +1,153 @@
+"""
+Command registry of Epson projector module.
+
+Compiled once at import from the command tables in const, so hot paths
+look commands, options and translated values up instead of scanning the
+tables and formatting strings on every request.
+"""
+from .const import (
+    CR,
+    EPSON_CONFIG_RANGES,
+    EPSON_KEY_COMMANDS,
+    EPSON_OPTIONS,
+    EPSON_READOUTS,
+    GET_CR,
+    POWER,
+)
+
+# Translated values go in steps of 5 for these translators, others in steps of 1.
+TRANSLATOR_STEPS = {'50-100': 5}
+
+
+def _to_epson(value, translator):
+    """Humanized int to the value the projector uses."""
+    if translator == '21':
+        return int(value * 256/21)
+
+    if translator == '50-100':
+        return int((value - 50) / 5) * 25
+
+    if translator == '100':
+        return int(value * 256/101)
+
+    return value
+
+
+def _from_epson(value, translator):
+    """Int reported by the projector to its humanized value."""
+    if translator == '50-100':
+        return int(value / 25 * 5 + 50)
+
+    if translator == '21':
+        return round(value * 21/256)
+
+    if translator == '100':
+        return round(value * 101/256)
+
+    return value
+
+
+def _build_translation_tables():
+    """Per translator, tuples indexed by the value to translate."""
+    to_epson = {}
+    from_epson = {}
+    for entry in (*EPSON_CONFIG_RANGES.values(), *EPSON_READOUTS.values()):
+        translator = entry['value_translator']
+        if translator is None:
+            continue
+        size = max(len(to_epson.get(translator, ())), entry['humanized_range'].stop)
+        to_epson[translator] = tuple(_to_epson(value, translator) for value in range(size))
+        size = max(len(from_epson.get(translator, ())), entry['valid_range'].stop)
+        from_epson[translator] = tuple(_from_epson(value, translator) for value in range(size))
+    return to_epson, from_epson
+
+
+# Pre-encoded request of every key command, e.g. "PWR ON" -> b"PWR ON\r"
+KEY_COMMANDS = {
+    name: ' '.join(' '.join(part) for part in parts) for name, parts in EPSON_KEY_COMMANDS.items()
+}
+KEY_COMMAND_PAYLOADS = {name: (command + CR).encode() for name, command in KEY_COMMANDS.items()}
+# Epson codes a key command changes
+KEY_COMMAND_CODES = {
+    name: tuple(dict.fromkeys(code for code, _ in parts)) for name, parts in EPSON_KEY_COMMANDS.items()
+}
+
+# Pre-encoded query of every known property, e.g. "PWR" -> b"PWR?\r"
+QUERY_PAYLOADS = {
+    code: (code + GET_CR).encode()
+    for code in (
+        POWER,
+        *(entry['epson_code'] for entry in EPSON_CONFIG_RANGES.values()),
+        *(entry['epson_code'] for entry in EPSON_READOUTS.values()),
+        *(entry['epson_command'] for entry in EPSON_OPTIONS.values()),
+    )
+}
+
+# Per option: raw value reported by the projector -> human name, human name -> key command
+# and human name -> raw value
+OPTION_NAMES = {
+    key: {raw: name for name, _, raw in entry['options']} for key, entry in EPSON_OPTIONS.items()
+}
+OPTION_COMMANDS = {
+    key: {name: command for name, command, _ in entry['options']} for key, entry in EPSON_OPTIONS.items()
+}
+OPTION_RAW_VALUES = {
+    key: {name: raw for name, _, raw in entry['options']} for key, entry in EPSON_OPTIONS.items()
+}
+
+TO_EPSON_TABLES, FROM_EPSON_TABLES = _build_translation_tables()
+
+
+def query_payload(code):
+    """Bytes querying code."""
+    return QUERY_PAYLOADS.get(code) or (code + GET_CR).encode()
+
+
+def translate_to_epson(value, translator):
+    """Humanized value to the int the projector uses."""
+    value = int(value)
+    table = TO_EPSON_TABLES.get(translator)
+    if table is not None and 0 <= value < len(table):
+        return table[value]
+    return _to_epson(value, translator)
+
+
+def translate_from_epson(value, translator):
+    """Value reported by the projector to its humanized value, untranslated values are kept as is."""
+    if translator is None:
+        return value
+    value = int(value)
+    table = FROM_EPSON_TABLES.get(translator)
+    if table is not None and 0 <= value < len(table):
+        return table[value]
+    return _from_epson(value, translator)
+
+
+def validate():
+    """Return list of problems of the command tables, empty when they are consistent."""
+    problems = []
+    for key, entry in {**EPSON_CONFIG_RANGES, **EPSON_READOUTS}.items():
+        translator = entry['value_translator']
+        humanized = entry['humanized_range']
+        step = TRANSLATOR_STEPS.get(translator, 1)
+        for value in range(humanized.start, humanized.stop, step):
+            raw = translate_to_epson(value, translator)
+            if raw not in entry['valid_range']:
+                problems.append(f"{key}: {value} translates to {raw}, out of valid range")
+            elif int(translate_from_epson(raw, translator)) != value:
+                problems.append(
+                    f"{key}: {value} translates to {raw}, which reads back as "
+                    f"{translate_from_epson(raw, translator)}"
+                )
+    for key, entry in EPSON_OPTIONS.items():
+        if len(OPTION_NAMES[key]) != len(entry['options']):
+            problems.append(f"{key}: options share a raw value")
+        for name, command, _ in entry['options']:
+            if command not in EPSON_KEY_COMMANDS:
+                problems.append(f"{key}: option {name} sends unknown command {command}")
+    return problems
+
+
+_problems = validate()
+if _problems:
+    raise Exception("Inconsistent command tables: " + "; ".join(_problems))
@@ -0,0 +1,150 @@
+"""Single-writer request scheduler of Epson projector module."""
+import asyncio
+import itertools
+import logging
+import time
+
+from .const import BUSY_POLL_INTERVAL, PRIORITY_USER, QUEUE_TIMEOUTS
+from .metrics import METRICS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Request:
+    """Queued request waiting for its turn on the connection."""
+
+    def __init__(self, request, future, busy_command, priority):
+        self.request = request
+        self.future = future
+        self.busy_command = busy_command
+        self.priority = priority
+        self.queued_at = time.monotonic()
+        self.expire_handle = None
+
+
+class RequestScheduler:
+    """
+    Run requests to the projector one at a time, by priority.
+
+    Lower priority value runs first (user commands before background polls),
+    requests of equal priority run in submission order. While the projector
+    is busy (e.g. warming up after PWR ON) requests wait in the queue instead
+    of failing, and a request that did not start before its deadline fails
+    with asyncio.TimeoutError. During power transitions the projector is
+    probed for its PWR? state, so waiting requests run as soon as it is
+    ready instead of after the full busy time.
+    """
+
+    def __init__(self, lock, host=None, probe=None):
+        """
+        Init request scheduler.
+
+        :param obj lock:    Lock tracking when the projector is busy
+        :param str host:    Address of projector, labels its metrics
+        :param probe:       Coroutine function returning the PWR? state, bypassing the queue
+        """
+        self._lock = lock
+        self._host = host
+        self._probe = probe
+        self._queue = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+        self._worker = None
+
+    async def submit(self, request, priority=PRIORITY_USER, deadline=None, busy_command=None):
+        """
+        Queue request and wait for its result.
+
+        :param request:             Coroutine function sending the request
+        :param int priority:        Lower runs first, see PRIORITY_* consts
+        :param float deadline:      Seconds the request may wait in the queue
+        :param str busy_command:    Command to mark projector busy after
+        """
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+        entry = _Request(request, loop.create_future(), busy_command, priority)
+        deadline = deadline if deadline is not None else QUEUE_TIMEOUTS[priority]
+        entry.expire_handle = loop.call_later(deadline, self._expire, entry)
+        self._queue.put_nowait((priority, next(self._counter), entry))
+        METRICS.set("epson_queue_depth", self._queue.qsize(), host=self._host)
+        return await entry.future
+
+    def close(self):
+        """Stop worker and fail all queued requests."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        while not self._queue.empty():
+            _, _, entry = self._queue.get_nowait()
+            entry.expire_handle.cancel()
+            if not entry.future.done():
+                entry.future.set_exception(Exception("Connection closed"))
+
+    def _expire(self, entry):
+        """Fail request which did not start before its deadline."""
+        if not entry.future.done():
+            _LOGGER.debug("Request expired in queue")
+            METRICS.inc("epson_queue_expired_total", host=self._host, priority=entry.priority)
+            entry.future.set_exception(
+                asyncio.TimeoutError("Request expired before projector was ready")
+            )
+
+    async def _probe_power_state(self):
+        """Ask projector for its power state, releasing the lock once it is ready."""
+        try:
+            state = await self._probe()
+        except Exception as err:
+            # Busy projectors may not answer, the lock's upper bound still applies.
+            _LOGGER.debug("Power state probe failed: %s", err)
+            return
+        if self._lock.update_power_state(state):
+            _LOGGER.debug("Projector ready in power state %s", state)
+
+    async def _run(self):
+        """Worker running queued requests one by one."""
+        while True:
+            item = await self._queue.get()
+            entry = item[2]
+            if entry.future.done():
+                continue
+
+            remaining = self._lock.time_remaining()
+            if remaining > 0:
+                # Put it back so a more urgent request can overtake it.
+                self._queue.put_nowait(item)
+                if self._probe is None or not self._lock.awaits_power_state:
+                    await asyncio.sleep(remaining)
+                    continue
+                await asyncio.sleep(min(remaining, BUSY_POLL_INTERVAL))
+                await self._probe_power_state()
+                continue
+
+            entry.expire_handle.cancel()
+            # Includes time spent waiting for a busy projector.
+            METRICS.observe(
+                "epson_queue_wait_seconds",
+                time.monotonic() - entry.queued_at,
+                host=self._host,
+                priority=entry.priority,
+            )
+            METRICS.set("epson_queue_depth", self._queue.qsize(), host=self._host)
+            # Own task, so exceptions handed to callers don't carry the frame of this worker.
+            task = asyncio.create_task(entry.request())
+            try:
+                await asyncio.wait((task,))
+            except asyncio.CancelledError:
+                task.cancel()
+                entry.future.cancel()
+                raise
+            if task.cancelled():
+                entry.future.cancel()
+            elif task.exception() is not None:
+                if not entry.future.done():
+                    entry.future.set_exception(task.exception())
+            else:
+                if not entry.future.done():
+                    entry.future.set_result(task.result())
+                # A refused command (ERR) leaves the projector as it was, e.g. still in standby.
+                if entry.busy_command:
+                    self._lock.setLock(entry.busy_command)
@@ -0,0 +1,391 @@
+"""Simulated Epson projector speaking ESC/VP.net, for testing and benchmarking."""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+import tty
+
+from .const import (
+    CR,
+    COLON,
+    ERROR,
+    ESCVPNET_HELLO_COMMAND,
+    EPSON_CONFIG_RANGES,
+    EPSON_READOUTS,
+    EPSON_OPTIONS,
+    EPSON_KEY_COMMANDS,
+    LENS_MEMORY,
+    POWER,
+    PWR_ON_STATE,
+    PWR_OFF_STATE,
+    PWR_WARMING_STATE,
+    PWR_COOLING_STATE,
+    SERIAL_BYTE,
+    SNO,
+    TCP_PORT,
+    TCP_SERIAL_PORT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Reply to the ESC/VP.net hello, byte 14 (0x20) means the connection was accepted.
+ESCVPNET_HELLO_REPLY = b"ESC/VP.net\x10\x03\x00\x00\x20\x00"
+SERIAL_REPLY_HEADER = bytes(24)
+
+
+class ProjectorSimulator:
+    """
+    Fake projector serving the ESC/VP.net protocol on localhost.
+
+    Answers ``CMD?`` queries and ``CMD value`` commands from an in-memory
+    state seeded from const, replies ``ERR`` to anything a real projector
+    would reject (unknown commands, values out of range, most commands while
+    not powered on), walks through warm-up and cool-down after ``PWR``
+    commands and moves the lens readouts gradually after ``POPLP`` recalls.
+    Replies are sent one at a time like on the real hardware, each after a
+    configurable latency, and faults can be injected at random.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=TCP_PORT,
+        serial_port=TCP_SERIAL_PORT,
+        serial_number="SIMUL001",
+        power=PWR_OFF_STATE,
+        warmup_time=30,
+        cooldown_time=10,
+        latency=0.0,
+        jitter=0.0,
+        command_latency=None,
+        error_rate=0.0,
+        drop_rate=0.0,
+        seed=None,
+        lens_speed=100,
+    ):
+        """
+        Init simulated projector.
+
+        :param str host:            Address to listen on
+        :param int port:            ESC/VP.net port, 0 picks a free one
+        :param int serial_port:     Serial number port, 0 picks a free one, None disables it
+        :param str serial_number:   Serial number reported on serial_port
+        :param str power:           Initial PWR state code
+        :param float warmup_time:   Seconds spent warming up after PWR ON
+        :param float cooldown_time: Seconds spent cooling down after PWR OFF
+        :param float latency:       Seconds before every reply
+        :param float jitter:        Max random seconds added to latency
+        :param dict command_latency: Epson code to latency overriding the default one
+        :param float error_rate:    Probability of replying ERR to a valid request
+        :param float drop_rate:     Probability of not replying at all
+        :param int seed:            Seed of fault injection and jitter
+        :param float lens_speed:    Readout steps per second the lens moves after a recall
+        """
+        self.host = host
+        self.port = port
+        self.serial_port = serial_port
+        self.serial_number = serial_number
+        self.warmup_time = warmup_time
+        self.cooldown_time = cooldown_time
+        self.latency = latency
+        self.jitter = jitter
+        self.command_latency = command_latency or {}
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.lens_speed = lens_speed
+        self.requests = 0
+        self.state = self._initial_state()
+        self.state[POWER] = power
+        self._random = random.Random(seed)
+        self._power_transition = None
+        # Readout code to (start position, target position, started at) while the lens moves
+        self._lens_motion = {}
+        self._servers = []
+        self._connections = set()
+        self._ptys = []
+
+    @staticmethod
+    def _initial_state():
+        """State of a projector fresh from the factory."""
+        state = {}
+        for entry in EPSON_CONFIG_RANGES.values():
+            state[entry['epson_code']] = str(entry['valid_range'][len(entry['valid_range']) // 2])
+        for entry in EPSON_READOUTS.values():
+            state[entry['epson_code']] = str(entry['valid_range'][len(entry['valid_range']) // 2])
+        for entry in EPSON_OPTIONS.values():
+            state[entry['epson_command']] = entry['options'][0][2]
+        return state
+
+    async def start(self):
+        """Start listening, actual ports are stored in port and serial_port."""
+        server = await asyncio.start_server(self._handle_escvpnet, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self._servers.append(server)
+        if self.serial_port is not None:
+            server = await asyncio.start_server(self._handle_serial, self.host, self.serial_port)
+            self.serial_port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        _LOGGER.info("Simulated projector listening on %s:%s", self.host, self.port)
+
+    async def start_pty(self):
+        """
+        Serve ESC/VP21 on a pseudo terminal, like the projector's RS-232 port.
+
+        Returns path of the terminal to open as serial port, it stays
+        served until stop().
+        """
+        loop = asyncio.get_running_loop()
+        master, slave = os.openpty()
+        tty.setraw(master)
+        tty.setraw(slave)
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(master, "rb", 0, closefd=False)
+        )
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, os.fdopen(master, "wb", 0)
+        )
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        self._ptys.append(slave)
+        self._connections.add(asyncio.create_task(self._handle_pty(reader, writer)))
+        path = os.ttyname(slave)
+        _LOGGER.info("Simulated projector listening on %s", path)
+        return path
+
+    async def stop(self):
+        """Stop listening and drop open connections."""
+        for server in self._servers:
+            server.close()
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        for slave in self._ptys:
+            os.close(slave)
+        self._ptys = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    @property
+    def power(self):
+        """Current PWR state code, advancing warm-up and cool-down."""
+        if self._power_transition:
+            final_state, ready_at = self._power_transition
+            if time.monotonic() >= ready_at:
+                self.state[POWER] = final_state
+                self._power_transition = None
+        return self.state[POWER]
+
+    async def _handle_escvpnet(self, reader, writer):
+        """Serve one ESC/VP.net connection."""
+        self._connections.add(asyncio.current_task())
+        try:
+            hello = await reader.readexactly(len(ESCVPNET_HELLO_COMMAND))
+            if hello != ESCVPNET_HELLO_COMMAND.encode():
+                return
+            writer.write(ESCVPNET_HELLO_REPLY)
+            await self.serve(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Cancelled by stop(), ending quietly keeps asyncio from reporting the handler.
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _handle_pty(self, reader, writer):
+        """Serve the pseudo terminal, there is no handshake on a serial line."""
+        try:
+            await self.serve(reader, writer)
+        except (asyncio.IncompleteReadError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, reader, writer):
+        """Answer requests read from reader until the stream ends."""
+        while True:
+            line = await reader.readuntil(CR.encode())
+            reply = await self.handle_request(line.decode(errors="replace").strip())
+            if reply is not None:
+                writer.write(reply.encode())
+                await writer.drain()
+
+    async def _handle_serial(self, reader, writer):
+        """Serve one request for the serial number."""
+        try:
+            request = await reader.readexactly(len(SERIAL_BYTE))
+            if request == bytes(SERIAL_BYTE):
+                writer.write(SERIAL_REPLY_HEADER + self.serial_number.encode())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request):
+        """Return reply to a single request line, None to stay silent."""
+        self.requests += 1
+        code = request.split(" ")[0].rstrip("?")
+        latency = self.command_latency.get(code, self.latency)
+        if self.jitter:
+            latency += self._random.uniform(0, self.jitter)
+        if latency:
+            await asyncio.sleep(latency)
+
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            return None
+        if self.error_rate and self._random.random() < self.error_rate:
+            return ERROR + CR + COLON
+
+        if not request:
+            return COLON
+        if request.endswith("?"):
+            value = self._query(request[:-1])
+            if value is None:
+                return ERROR + CR + COLON
+            return f"{request[:-1]}={value}{CR}{COLON}"
+        if self._command(code, request[len(code):].strip()):
+            return COLON
+        return ERROR + CR + COLON
+
+    def _query(self, code):
+        """Value of code, None if the projector would reply ERR."""
+        if code == POWER:
+            return self.power
+        if self.power != PWR_ON_STATE:
+            return None
+        if code == SNO:
+            return self.serial_number
+        if code in self._lens_motion:
+            self._move_lens()
+        return self.state.get(code)
+
+    def _command(self, code, value):
+        """Apply command, False if the projector would reply ERR."""
+        if code == POWER:
+            return self._set_power(value)
+        if self.power != PWR_ON_STATE:
+            return False
+
+        for entry in EPSON_CONFIG_RANGES.values():
+            if entry['epson_code'] == code:
+                if not value.isdigit() or int(value) not in entry['valid_range']:
+                    return False
+                self.state[code] = value
+                return True
+        for entry in EPSON_OPTIONS.values():
+            if entry['epson_command'] == code:
+                # Options are set with their key command's value, which may differ from the one read back
+                for _, command, raw in entry['options']:
+                    if (code, value) in EPSON_KEY_COMMANDS[command]:
+                        self.state[code] = raw
+                        return True
+                return False
+        if (code, value) not in (
+            command for commands in EPSON_KEY_COMMANDS.values() for command in commands
+        ):
+            return False
+        if code == LENS_MEMORY:
+            self._recall_lens_memory(int(value, 16))
+        return True
+
+    def _recall_lens_memory(self, memory):
+        """Start moving the lens towards the positions stored in memory."""
+        self._move_lens()
+        now = time.monotonic()
+        for index, entry in enumerate(EPSON_READOUTS.values()):
+            code = entry['epson_code']
+            valid_range = entry['valid_range']
+            target = valid_range[(memory * 97 + index * 211) % len(valid_range)]
+            self._lens_motion[code] = (int(self.state[code]), target, now)
+
+    def _move_lens(self):
+        """Advance lens readouts to where the motors have moved them by now."""
+        now = time.monotonic()
+        for code, (start, target, started_at) in list(self._lens_motion.items()):
+            steps = int((now - started_at) * self.lens_speed)
+            if steps >= abs(target - start):
+                self.state[code] = str(target)
+                del self._lens_motion[code]
+            else:
+                self.state[code] = str(start + steps if target > start else start - steps)
+
+    def _set_power(self, value):
+        """Start warm-up or cool-down."""
+        power = self.power
+        if value == "ON":
+            if power in (PWR_ON_STATE, PWR_WARMING_STATE):
+                return True
+            if power == PWR_COOLING_STATE:
+                return False
+            self.state[POWER] = PWR_WARMING_STATE
+            self._power_transition = (PWR_ON_STATE, time.monotonic() + self.warmup_time)
+            return True
+        if value == "OFF":
+            if power in (PWR_OFF_STATE, PWR_COOLING_STATE):
+                return True
+            if power == PWR_WARMING_STATE:
+                return False
+            self.state[POWER] = PWR_COOLING_STATE
+            self._power_transition = (PWR_OFF_STATE, time.monotonic() + self.cooldown_time)
+            return True
+        return False
+
+
+def main():
+    """Run a simulated projector until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=TCP_PORT)
+    parser.add_argument("--serial-port", type=int, default=TCP_SERIAL_PORT)
+    parser.add_argument("--power", default=PWR_OFF_STATE, help="initial PWR state code")
+    parser.add_argument("--warmup", type=float, default=30)
+    parser.add_argument("--cooldown", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--lens-speed", type=float, default=100, help="lens readout steps per second")
+    parser.add_argument("--pty", action="store_true", help="also serve RS-232 on a pseudo terminal")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    simulator = ProjectorSimulator(
+        host=args.host,
+        port=args.port,
+        serial_port=args.serial_port,
+        power=args.power,
+        warmup_time=args.warmup,
+        cooldown_time=args.cooldown,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+        lens_speed=args.lens_speed,
+    )
+
+    async def run():
+        async with simulator:
+            if args.pty:
+                print(await simulator.start_pty(), flush=True)
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,97 @@
-from .const import TIMEOUT_TIMES, DEFAULT_TIMEOUT_TIME
+from .const import (
+    TIMEOUT_TIMES,
+    DEFAULT_TIMEOUT_TIME,
+    EPSON_KEY_COMMANDS,
+    ADAPTIVE_TIMEOUT_FLOOR,
+    ADAPTIVE_TIMEOUT_CEILING,
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES,
+)
 
 def get_timeout(command, timeout_scale=1):
     return TIMEOUT_TIMES.get(command, DEFAULT_TIMEOUT_TIME) * timeout_scale
+
+
+def timeout_key(command):
+    """
+    Key latency of command is tracked by.
+
+    Queries (``PWR``) and key commands (``PWR ON``) are their own key, raw set
+    requests share one per code (``BRIGHT 76`` -> ``BRIGHT set``).
+    """
+    if " " in command and command not in EPSON_KEY_COMMANDS and command not in TIMEOUT_TIMES:
+        return command.split(" ", 1)[0] + " set"
+    return command
+
+
+class AdaptiveTimeouts:
+    """
+    Timeouts derived from the latency observed per command.
+
+    Keeps an EWMA of the latency and of its deviation per command, like TCP
+    does for its retransmission timeout; mean plus four deviations estimates
+    the slowest replies (~p99). That estimate is the timeout, kept between a
+    floor and a ceiling (or the static timeout, when that is longer). A
+    timed out request counts as a reply taking twice the timeout, so a too
+    short timeout grows back quickly. Commands with too few replies seen
+    keep their static timeout.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(
+        self,
+        timeout_scale=1.0,
+        floor=ADAPTIVE_TIMEOUT_FLOOR,
+        ceiling=ADAPTIVE_TIMEOUT_CEILING,
+        min_samples=ADAPTIVE_TIMEOUT_MIN_SAMPLES,
+        profile=None,
+    ):
+        """
+        Init timeouts.
+
+        :param float timeout_scale: Factor to multiply static timeouts by
+        :param float floor:         Shortest timeout learned
+        :param float ceiling:       Longest timeout learned, unless static one is longer
+        :param int min_samples:     Replies needed before learned timeout is used
+        :param dict profile:        Learned latencies to start from, see profile()
+        """
+        self.timeout_scale = timeout_scale
+        self._floor = floor
+        self._ceiling = ceiling
+        self._min_samples = min_samples
+        # key -> [mean, deviation, samples]
+        self._stats = {key: list(stats) for key, stats in (profile or {}).items()}
+
+    def get(self, command):
+        """Timeout in seconds for command."""
+        static = get_timeout(command, self.timeout_scale)
+        stats = self._stats.get(timeout_key(command))
+        if stats is None or stats[2] < self._min_samples:
+            return static
+        mean, deviation, _ = stats
+        # Static timeouts beyond the ceiling (PWR ON waits for warm-up) raise it.
+        return max(self._floor, min(mean + 4 * deviation, max(self._ceiling, static)))
+
+    def record(self, command, latency):
+        """Account latency of a reply to command."""
+        key = timeout_key(command)
+        stats = self._stats.get(key)
+        if stats is None:
+            self._stats[key] = [latency, latency / 2, 1]
+            return
+        mean, deviation, samples = stats
+        stats[1] = (1 - self.BETA) * deviation + self.BETA * abs(mean - latency)
+        stats[0] = (1 - self.ALPHA) * mean + self.ALPHA * latency
+        stats[2] = samples + 1
+
+    def record_timeout(self, command, timeout):
+        """Account request to command which got no reply within timeout."""
+        self.record(command, 2 * timeout)
+
+    def profile(self):
+        """Learned latencies, to persist and pass back as profile."""
+        return {
+            key: [round(mean, 4), round(deviation, 4), samples]
+            for key, (mean, deviation, samples) in self._stats.items()
+        }
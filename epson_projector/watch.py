@@ -0,0 +1,238 @@
+"""Shared property watching of Epson projector module."""
+import asyncio
+import collections
+import logging
+import time
+
+from .const import (
+    EPSON_CONFIG_RANGES,
+    EPSON_OPTIONS,
+    EPSON_READOUTS,
+    POLL_INTERVALS,
+    POLL_TIMEOUT,
+    POWER,
+    PRIORITY_POLL,
+    PWR_ON_STATE,
+)
+from .metrics import METRICS
+from .polling import PollScheduler, related_properties
+from .registry import OPTION_NAMES
+
+_LOGGER = logging.getLogger(__name__)
+
+# Epson code every watchable property is queried with
+WATCH_CODES = {
+    POWER: POWER,
+    **{key: entry['epson_code'] for key, entry in EPSON_CONFIG_RANGES.items()},
+    **{key: entry['epson_code'] for key, entry in EPSON_READOUTS.items()},
+    **{key: entry['epson_command'] for key, entry in EPSON_OPTIONS.items()},
+}
+
+
+class _Watcher:
+    """Changes waiting for one consumer of PropertyWatch.watch()."""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def deliver(self, changes):
+        """Add changes of watched keys, newer values replace ones not consumed yet."""
+        changes = {key: value for key, value in changes.items() if key in self.keys}
+        if changes:
+            self.pending.update(changes)
+            self.ready.set()
+
+
+class PropertyWatch:
+    """
+    One polling engine per projector, shared by all its watchers.
+
+    Polls the union of the watched properties on a PollScheduler, so N
+    watchers cost one poll stream. Every watcher gets the values it watches
+    when it starts, then only the ones that changed. Values are the power
+    state code for PWR, translated numbers for config ranges and readouts
+    and option names for options. The engine runs while anyone watches.
+    """
+
+    def __init__(self, projector, host=None, intervals=POLL_INTERVALS, slots=None, timeout=POLL_TIMEOUT):
+        """
+        Init watch engine, polling starts with the first watcher.
+
+        :param obj projector:   Projector to poll
+        :param str host:        Address of projector, labels its metrics
+        :param dict intervals:  Property to base poll interval in seconds, see PollScheduler;
+                                POLL_INTERVALS for properties left out
+        :param obj slots:       Semaphore shared by projectors polled at the same time
+        :param float timeout:   Seconds one poll round may take before it is abandoned
+        """
+        self._projector = projector
+        self._host = host
+        self._intervals = intervals
+        self._slots = slots
+        self._timeout = timeout
+        # Power is always polled, other properties only decide what is read while it is on.
+        self._poller = PollScheduler({POWER: intervals.get(POWER, POLL_INTERVALS[POWER])})
+        self._watchers = []
+        self._values = {}
+        # Keys sampled outside the poll stream, with the number of samplers of each
+        self._held = collections.Counter()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def watch(self, properties):
+        """
+        Yield dicts of property to value, the known values first and then changes.
+
+        :param properties:  Keys of EPSON_CONFIG_RANGES, EPSON_READOUTS,
+                            EPSON_OPTIONS or PWR
+        """
+        keys = set(properties)
+        unknown = keys - set(WATCH_CODES)
+        if unknown:
+            raise Exception(f"Error!!! Trying to watch {', '.join(sorted(unknown))} is not accepted!")
+
+        watcher = _Watcher(keys)
+        watcher.deliver(self._values)
+        self._watchers.append(watcher)
+        for key in keys:
+            self._poller.add(key, self._intervals.get(key, POLL_INTERVALS[key]))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        try:
+            while True:
+                await watcher.ready.wait()
+                watcher.ready.clear()
+                changes, watcher.pending = watcher.pending, {}
+                yield changes
+        finally:
+            self._watchers.remove(watcher)
+            watched = set().union(*(other.keys for other in self._watchers))
+            for key in keys - watched - {POWER}:
+                self._poller.remove(key)
+                self._values.pop(key, None)
+            if not self._watchers and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    def burst(self, epson_codes):
+        """Poll properties commands with given codes may change at a fast rate for a while."""
+        keys = set()
+        for code in epson_codes:
+            keys.update(key for key, key_code in WATCH_CODES.items() if key_code == code)
+            keys.update(related_properties(code))
+        self._poller.burst(keys - set(self._held))
+        self._wakeup.set()
+
+    def record(self, values):
+        """Hand values read outside the poll stream to watchers, e.g. lens positions while it moves."""
+        changes = {}
+        for key, value in values.items():
+            self._record(key, value, changes)
+        for watcher in self._watchers:
+            watcher.deliver(changes)
+
+    def hold(self, keys):
+        """Leave keys to a sampler handing its values to record(), they are not burst until released."""
+        self._held.update(keys)
+        self._poller.end_burst(keys)
+
+    def release(self, keys):
+        """Poll keys held for a sampler at their own interval again, once no sampler holds them."""
+        self._held.subtract(keys)
+        released = [key for key in keys if self._held[key] <= 0]
+        for key in released:
+            del self._held[key]
+        self._poller.end_burst(released)
+        self._wakeup.set()
+
+    async def _run(self):
+        """Poll whatever is due until the last watcher leaves."""
+        while True:
+            keys = self._poller.due()
+            if keys:
+                try:
+                    if self._slots is None:
+                        await self._poll_round(keys)
+                    else:
+                        # Bound how many projectors are polled at once
+                        async with self._slots:
+                            await self._poll_round(keys)
+                except Exception as err:
+                    _LOGGER.warning("Polling %s failed: %r", self._host, err)
+                    METRICS.inc("epson_poll_errors_total", host=self._host)
+                    for key in self._poller.due():
+                        self._poller.record_error(key)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poller.time_until_due())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll_round(self, keys):
+        """Poll due keys within the round timeout, then hand out what changed."""
+        start = time.monotonic()
+        changes = {}
+        try:
+            await asyncio.wait_for(self._poll(keys, changes), self._timeout)
+        finally:
+            # Values read before a failure are still news.
+            for watcher in self._watchers:
+                watcher.deliver(changes)
+        METRICS.observe("epson_poll_seconds", time.monotonic() - start, host=self._host)
+
+    async def _poll(self, keys, changes):
+        """Read due keys, collecting changed values into changes."""
+        if POWER in keys:
+            power = await self._projector.get_power(priority=PRIORITY_POLL)
+            self._record(POWER, power, changes)
+            # During startup other codes may come back which break reading the rest,
+            # so properties are only read while the projector is known to be on.
+            self._poller.set_standby(power != PWR_ON_STATE)
+            if power == PWR_ON_STATE:
+                # Coming out of standby makes every property due right away
+                keys = self._poller.due()
+        if self._poller.standby:
+            return
+
+        configs = [key for key in keys if key in EPSON_CONFIG_RANGES or key in EPSON_READOUTS]
+        options = [key for key in keys if key in EPSON_OPTIONS]
+        await asyncio.gather(self._read_configs(configs, changes), self._read_options(options, changes))
+
+    async def _read_configs(self, configs, changes):
+        if not configs:
+            return
+        values = await self._projector.read_config_values(configs, priority=PRIORITY_POLL)
+        for key, value in values.items():
+            if isinstance(value, Exception):
+                _LOGGER.debug("Reading %s failed: %s", key, value)
+                self._poller.record_error(key)
+                continue
+            self._record(key, int(value), changes)
+
+    async def _read_options(self, options, changes):
+        if not options:
+            return
+        raw_values = await self._projector.get_properties(
+            [WATCH_CODES[key] for key in options], priority=PRIORITY_POLL
+        )
+        for key in options:
+            raw_value = raw_values[WATCH_CODES[key]]
+            if isinstance(raw_value, Exception):
+                _LOGGER.debug("Reading %s failed: %s", key, raw_value)
+                self._poller.record_error(key)
+                continue
+            self._record(key, OPTION_NAMES[key].get(raw_value), changes)
+
+    def _record(self, key, value, changes):
+        """Record polled value, adding it to changes unless it is known already."""
+        if key not in self._poller:
+            # Nobody watches it anymore
+            return
+        self._poller.record(key, value)
+        if value is not None and self._values.get(key) != value:
+            self._values[key] = value
+            changes[key] = value
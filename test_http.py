@@ -5,6 +5,7 @@ from epson_projector.const import POWER, VOLUME
 import asyncio
 import aiohttp
 import logging
+import os
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,10 +28,9 @@ async def main_web():
 async def run(websession):
     """Use Projector class of epson module and check if it is turned on."""
     projector = epson.Projector(
-        host="192.168.11.37",
+        host=os.environ.get("EPSON_IP", "192.168.11.37"),
         websession=websession,
         type="http",
-        loop=asyncio.get_event_loop(),
     )
     data = await projector.get_property(POWER)
     print(data)
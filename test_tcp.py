@@ -1,16 +1,26 @@
 import asyncio
+import os
 import epson_projector as epson
-from epson_projector.const import (POWER, PWR_OFF, VOLUME)
+from epson_projector.const import (POWER, PWR_OFF, PWR_ON_STATE, VOLUME)
+from epson_projector.simulator import ProjectorSimulator
 
 
 async def main_tcp():
-    """Run main with TCP session."""
-    await run()
+    """Run main with TCP session, against a simulated projector unless EPSON_IP is set."""
+    host = os.environ.get('EPSON_IP')
+    if host:
+        await run(host)
+        return
 
+    async with ProjectorSimulator(port=0, serial_port=0, power=PWR_ON_STATE) as simulator:
+        await run(simulator.host, simulator.port, simulator.serial_port)
 
-async def run():
-    projector = epson.Projector(host='192.168.11.37',
-                                type='tcp')
+
+async def run(host, port=3629, serial_port=3620):
+    projector = epson.Projector(host=host,
+                                type='tcp',
+                                port=port,
+                                serial_port=serial_port)
     data = await projector.get_power()
     print(data)
     # data2 = await projector.get_property(VOLUME)
@@ -19,7 +29,7 @@ async def run():
     dataa = await projector.get_serial_number()
     print("proj2", dataa)
     # await projector.send_command(PWR_OFF)
-    # projector.close()
+    projector.close()
 
 loop = asyncio.get_event_loop()
 loop.run_until_complete(main_tcp())
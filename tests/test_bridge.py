@@ -0,0 +1,116 @@
+"""Tests of the MQTT bridge, against a recording client instead of a broker."""
+import asyncio
+import unittest
+from unittest import mock
+
+import asyncio_mqtt_based_client as bridge
+from epson_projector.const import PWR_ON_STATE
+from epson_projector.simulator import ProjectorSimulator
+
+
+class RecordingClient:
+    """Stands in for the MQTT client, recording what is published."""
+
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, topic, payload, retain=False):
+        self.published.append((topic, payload))
+        await asyncio.sleep(0)
+
+    def values(self, topic):
+        return [payload for published_topic, payload in self.published if published_topic == topic]
+
+
+class FailingClient:
+    """Client of a session which ended, every publish fails."""
+
+    async def publish(self, topic, payload, retain=False):
+        raise Exception("Disconnected")
+
+
+class PublishQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def test_newer_message_replaces_waiting_one(self):
+        queue = bridge.PublishQueue()
+        await queue.publish("epson/state/BRIGHTNESS", 40)
+        await queue.publish("epson/state/CONTRAST", 50)
+        await queue.publish("epson/state/BRIGHTNESS", 42)
+
+        client = RecordingClient()
+        task = asyncio.create_task(queue.run(client))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        self.assertEqual(
+            client.published, [("epson/state/BRIGHTNESS", 42), ("epson/state/CONTRAST", 50)]
+        )
+
+    async def test_oldest_topic_dropped_when_full(self):
+        queue = bridge.PublishQueue(max_size=2)
+        for topic in ("a", "b", "c"):
+            await queue.publish(topic, 1)
+        self.assertEqual(list(queue.pending), ["b", "c"])
+
+    async def test_messages_outlive_failed_session(self):
+        queue = bridge.PublishQueue()
+        await queue.publish("epson/state/BRIGHTNESS", 40)
+        with self.assertRaises(Exception):
+            await queue.run(FailingClient())
+
+        client = RecordingClient()
+        task = asyncio.create_task(queue.run(client))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        self.assertEqual(client.published, [("epson/state/BRIGHTNESS", 40)])
+
+
+
+@mock.patch.object(bridge, "COMMAND_DEBOUNCE", 0.1)
+class DebounceTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = ProjectorSimulator(port=0, serial_port=None, power=PWR_ON_STATE, latency=0.02)
+        await self.simulator.start()
+        self.device = bridge.EpsonDevice(self.simulator.host, port=self.simulator.port)
+        # Serial number port of the simulator is not served, nothing to identify
+        self.device.identified = True
+        self.client = RecordingClient()
+        self.topic = f"{self.device.base_topic}/state/BRIGHTNESS"
+
+    async def asyncTearDown(self):
+        await bridge.cancel_tasks(self.device.background_tasks)
+        self.device.projector.close()
+        await self.simulator.stop()
+
+    async def settle(self):
+        while self.device.background_tasks:
+            await asyncio.gather(*self.device.background_tasks)
+
+    async def test_dragged_slider_publishes_every_value_once_and_writes_few(self):
+        watch = asyncio.create_task(bridge.watch_projector(self.client, self.device))
+        while not self.client.values(self.topic):
+            await asyncio.sleep(0.01)
+        projector = self.device.projector
+        values = list(range(10, 60, 2))
+        with mock.patch.object(projector, "send_config_value", wraps=projector.send_config_value) as send:
+            for value in values:
+                await bridge.debounce_config_write(self.client, self.device, "BRIGHTNESS", value)
+                await asyncio.sleep(0.03)
+            await self.settle()
+        watch.cancel()
+
+        # No read-back or poll jumps back to a value written before the last one.
+        self.assertEqual(self.client.values(self.topic)[1:], values)
+        self.assertLess(send.call_count, len(values))
+        send.assert_called_with("BRIGHTNESS", 58)
+        self.assertEqual(await self.device.projector.read_config_value("BRIGHTNESS"), 58)
+
+    async def test_failed_write_rolls_back(self):
+        await bridge.publish_state(self.client, self.device, "BRIGHTNESS", 50)
+        self.simulator.error_rate = 1.0
+        await bridge.debounce_config_write(self.client, self.device, "BRIGHTNESS", 40)
+        await self.settle()
+
+        self.assertEqual(self.client.values(self.topic), [50, 40, 50])
+
+
+if __name__ == "__main__":
+    unittest.main()
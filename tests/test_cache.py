@@ -0,0 +1,64 @@
+"""Tests of serving recently read values from memory."""
+import time
+import unittest
+
+from epson_projector import Projector
+from epson_projector.cache import StateCache
+from epson_projector.const import POWER, PWR_ON_STATE
+from epson_projector.simulator import ProjectorSimulator
+
+
+class StateCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = StateCache()
+        self.cache.set("CMODE", "06")
+        self.cache.set("BRIGHT", "128")
+        self.cache.set("LUMINANCE", "00")
+
+    def test_command_drops_values_it_may_change(self):
+        self.cache.invalidate("CMODE")
+        self.assertIsNone(self.cache.get("CMODE"))
+        self.assertIsNone(self.cache.get("BRIGHT"))
+        self.assertEqual(self.cache.get("LUMINANCE"), "00")
+
+    def test_power_drops_everything(self):
+        self.cache.invalidate(POWER)
+        self.assertIsNone(self.cache.get("LUMINANCE"))
+
+    def test_value_expires(self):
+        cache = StateCache(ttls={"BRIGHT": 0.05})
+        cache.set("BRIGHT", "128")
+        self.assertEqual(cache.get("BRIGHT"), "128")
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("BRIGHT"))
+
+
+class CachedProjectorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = ProjectorSimulator(port=0, serial_port=None, power=PWR_ON_STATE)
+        await self.simulator.start()
+        self.projector = Projector(self.simulator.host, port=self.simulator.port, use_cache=True)
+
+    async def asyncTearDown(self):
+        self.projector.close()
+        await self.simulator.stop()
+
+    async def test_reads_are_served_from_cache(self):
+        self.assertEqual(await self.projector.read_config_value("BRIGHTNESS"), 50)
+        requests = self.simulator.requests
+        self.assertEqual(await self.projector.read_config_value("BRIGHTNESS"), 50)
+        self.assertEqual(self.simulator.requests, requests)
+
+    async def test_commands_invalidate_what_they_change(self):
+        await self.projector.read_config_value("BRIGHTNESS")
+        await self.projector.send_config_value("BRIGHTNESS", 40)
+        self.assertEqual(await self.projector.read_config_value("BRIGHTNESS"), 40)
+
+        await self.projector.send_command("CMODE_CINEMA")
+        requests = self.simulator.requests
+        await self.projector.read_config_value("BRIGHTNESS")
+        self.assertEqual(self.simulator.requests, requests + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
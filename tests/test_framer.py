@@ -0,0 +1,109 @@
+"""Tests of matching ESC/VP replies to requests."""
+import asyncio
+import unittest
+
+from epson_projector import Projector
+from epson_projector.const import PWR_ON_STATE
+from epson_projector.framer import ResponseFramer
+from epson_projector.simulator import ProjectorSimulator
+
+
+class ResponseFramerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_replies_resolve_requests_in_order(self):
+        framer = ResponseFramer()
+        power = framer.expect("PWR")
+        command = framer.expect()
+        bright = framer.expect("BRIGHT")
+
+        framer.feed(b"PWR=01\r:")
+        framer.feed(b":BRI")
+        framer.feed(b"GHT=128\r:")
+
+        self.assertEqual(await power, "01")
+        self.assertEqual(await command, "")
+        self.assertEqual(await bright, "128")
+
+    async def test_err_fails_request_in_turn(self):
+        errors = []
+        framer = ResponseFramer(on_error=errors.append)
+        command = framer.expect(command="CMODE")
+        power = framer.expect("PWR")
+
+        framer.feed(b"ERR\r:PWR=04\r:")
+
+        with self.assertRaises(Exception):
+            await command
+        self.assertEqual(await power, "04")
+        self.assertEqual(errors, ["CMODE"])
+
+    async def test_late_reply_of_timed_out_request_is_swallowed(self):
+        orphans = []
+        framer = ResponseFramer(on_orphan=orphans.append)
+        timed_out = framer.expect(command="CONTRAST")
+        command = framer.expect(command="CMODE")
+        timed_out.cancel()
+
+        framer.feed(b":ERR\r:")
+
+        with self.assertRaises(Exception):
+            await command
+        self.assertEqual(orphans, [""])
+
+    async def test_lost_reply_does_not_hold_up_next_request(self):
+        orphans = []
+        framer = ResponseFramer(on_orphan=orphans.append)
+        lost = framer.expect("CONTRAST")
+        bright = framer.expect("BRIGHT")
+        lost.cancel()
+
+        framer.feed(b"BRIGHT=128\r:")
+
+        self.assertEqual(await bright, "128")
+        self.assertEqual(orphans, [])
+
+    async def test_unsolicited_frame_is_discarded(self):
+        orphans = []
+        framer = ResponseFramer(on_orphan=orphans.append)
+        power = framer.expect("PWR")
+
+        framer.feed(b"IMEVENT=0001 03\r:PWR=01\r:")
+
+        self.assertEqual(await power, "01")
+        self.assertEqual(orphans, ["IMEVENT=0001 03"])
+
+
+class SimulatedRepliesTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = ProjectorSimulator(
+            port=0, serial_port=None, power=PWR_ON_STATE, command_latency={"CONTRAST": 0.5}
+        )
+        await self.simulator.start()
+        self.projector = Projector(self.simulator.host, port=self.simulator.port)
+
+    async def asyncTearDown(self):
+        self.projector.close()
+        await self.simulator.stop()
+
+    async def test_pipelined_queries(self):
+        values = await self.projector.get_properties(["PWR", "BRIGHT", "CMODE"])
+        self.assertEqual(values, {"PWR": PWR_ON_STATE, "BRIGHT": "128", "CMODE": "06"})
+
+    async def test_late_reply_does_not_answer_next_request(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.projector._projector.send_request(0.1, "CONTRAST 10")
+        with self.assertRaises(Exception) as context:
+            await self.projector.send_request("CMODE 99")
+        self.assertNotIsInstance(context.exception, asyncio.TimeoutError)
+        self.assertEqual(await self.projector.get_property("BRIGHT"), "128")
+
+    async def test_reply_never_sent(self):
+        self.simulator.drop_rate = 1.0
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.projector._projector.get_property("CMODE", 0.1)
+        self.simulator.drop_rate = 0.0
+        value = await self.projector._projector.get_property("BRIGHT", 1)
+        self.assertEqual(value, "128")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Tests of the HTTP connector against a fake web interface."""
+import unittest
+
+from aiohttp import web
+
+from epson_projector.const import PWR_ON_STATE
+from epson_projector.projector_http import ProjectorHttp
+from epson_projector.simulator import ProjectorSimulator
+
+
+class ProjectorHttpTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Serves the serial number port, the web interface is faked below
+        self.simulator = ProjectorSimulator(port=0, serial_port=0, power=PWR_ON_STATE)
+        await self.simulator.start()
+
+        async def json_query(request):
+            # The web interface replies with the bare value, or ERR
+            frame = (await self.simulator.handle_request(request.query["jsoncallback"])).rstrip("\r:")
+            _, _, value = frame.partition("=")
+            return web.json_response({"projector": {"feature": {"reply": value or frame}}})
+
+        app = web.Application()
+        app.router.add_get("/cgi-bin/json_query", json_query)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.simulator.host, 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.projector = ProjectorHttp(
+            self.simulator.host, port=port, serial_port=self.simulator.serial_port
+        )
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+        await self.simulator.stop()
+
+    async def test_serial_number(self):
+        self.assertEqual(await self.projector.get_serial(), self.simulator.serial_number)
+        await self.projector.close()
+
+    async def test_close_own_session(self):
+        self.assertEqual(await self.projector.get_property("PWR", 5), PWR_ON_STATE)
+        session = self.projector._session
+        await self.projector.close()
+        self.assertTrue(session.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Tests of the adaptive polling schedule."""
+import unittest
+
+from epson_projector.const import POWER
+from epson_projector.polling import PollScheduler
+
+
+class PollSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.poller = PollScheduler({POWER: 10, "BRIGHTNESS": 30}, backoff_limit=4, burst_interval=1)
+
+    def test_everything_due_at_start(self):
+        self.assertCountEqual(self.poller.due(now=0), [POWER, "BRIGHTNESS"])
+
+    def test_unchanged_value_backs_off_up_to_limit(self):
+        poller = PollScheduler({"BRIGHTNESS": 30}, backoff_limit=4)
+        intervals = []
+        for _ in range(4):
+            poller.record("BRIGHTNESS", 50, now=0)
+            intervals.append(poller.time_until_due(now=0))
+        # The first poll is a change.
+        self.assertEqual(intervals, [30, 60, 120, 120])
+
+    def test_change_resets_interval(self):
+        self.poller.record("BRIGHTNESS", 50, now=0)
+        self.poller.record("BRIGHTNESS", 50, now=30)
+        self.assertTrue(self.poller.record("BRIGHTNESS", 60, now=90))
+        self.assertNotIn("BRIGHTNESS", self.poller.due(now=119))
+        self.assertIn("BRIGHTNESS", self.poller.due(now=120))
+
+    def test_power_is_never_backed_off(self):
+        for now in (0, 10, 20):
+            self.poller.record(POWER, "01", now=now)
+        self.assertIn(POWER, self.poller.due(now=30))
+
+    def test_burst_polls_at_burst_interval(self):
+        self.poller.record("BRIGHTNESS", 50, now=0)
+        self.poller.burst(["BRIGHTNESS"], duration=5, now=2)
+        self.assertIn("BRIGHTNESS", self.poller.due(now=2))
+        self.poller.record("BRIGHTNESS", 50, now=2)
+        self.assertIn("BRIGHTNESS", self.poller.due(now=3))
+        # Once the burst is over the own interval applies again.
+        self.poller.record("BRIGHTNESS", 50, now=8)
+        self.assertNotIn("BRIGHTNESS", self.poller.due(now=9))
+
+    def test_standby_polls_power_only(self):
+        self.poller.record(POWER, "04", now=0)
+        self.poller.record("BRIGHTNESS", 50, now=0)
+        self.poller.set_standby(True)
+        self.assertEqual(self.poller.due(now=100), [POWER])
+
+        self.poller.set_standby(False)
+        self.assertCountEqual(self.poller.due(now=1), [POWER, "BRIGHTNESS"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests of applying several settings at once."""
+import unittest
+
+from epson_projector import Projector
+from epson_projector.const import ERROR, PWR_ON_STATE
+from epson_projector.simulator import ProjectorSimulator
+
+
+class RecordingSimulator(ProjectorSimulator):
+    """Simulator keeping the requests it was sent, refusing the ones in refused."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+        self.refused = set()
+
+    async def handle_request(self, request):
+        self.sent.append(request)
+        if request in self.refused:
+            return f"{ERROR}\r:"
+        return await super().handle_request(request)
+
+
+class ApplyProfileTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = RecordingSimulator(port=0, serial_port=None, power=PWR_ON_STATE)
+        await self.simulator.start()
+        self.projector = Projector(self.simulator.host, port=self.simulator.port)
+
+    async def asyncTearDown(self):
+        self.projector.close()
+        await self.simulator.stop()
+
+    def writes(self):
+        return [request for request in self.simulator.sent if request and not request.endswith("?")]
+
+    async def test_color_mode_goes_first_and_everything_is_read_back(self):
+        report = await self.projector.apply_profile(
+            {"BRIGHTNESS": 40, "CMODE": "Cinema", "HDR_RANGE": 3}
+        )
+
+        self.assertEqual(self.writes()[0], "CMODE 15")
+        self.assertCountEqual(self.writes(), ["CMODE 15", "BRIGHT 101", "HDRPQ 3"])
+        self.assertEqual(report, {
+            "BRIGHTNESS": {"status": "applied", "value": 40},
+            "CMODE": {"status": "applied", "value": "Cinema"},
+            "HDR_RANGE": {"status": "applied", "value": 3},
+        })
+
+    async def test_failed_leading_write_skips_the_rest(self):
+        self.simulator.refused.add("CMODE 15")
+        report = await self.projector.apply_profile({"CMODE": "Cinema", "BRIGHTNESS": 40})
+
+        self.assertEqual(report["CMODE"]["status"], "failed")
+        self.assertEqual(report["BRIGHTNESS"], {"status": "skipped"})
+        self.assertEqual(self.writes(), ["CMODE 15"])
+
+    async def test_invalid_profile_sends_nothing(self):
+        with self.assertRaises(Exception):
+            await self.projector.apply_profile({"BRIGHTNESS": 40, "CMODE": "No such mode"})
+        self.assertEqual(self.writes(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
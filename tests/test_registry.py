@@ -0,0 +1,45 @@
+"""Tests of the compiled command registry."""
+import unittest
+from unittest import mock
+
+from epson_projector import registry
+
+
+class ValidateTest(unittest.TestCase):
+    def test_shipped_tables_are_consistent(self):
+        self.assertEqual(registry.validate(), [])
+
+    def test_value_out_of_valid_range(self):
+        entry = {
+            'epson_code': 'BRIGHT',
+            'valid_range': range(0, 100),
+            'value_translator': '100',
+            'humanized_range': range(0, 101),
+        }
+        with mock.patch.dict(registry.EPSON_CONFIG_RANGES, {'TEST': entry}):
+            problems = registry.validate()
+        self.assertIn("TEST: 100 translates to 253, out of valid range", problems)
+
+    def test_option_sharing_raw_value_and_unknown_command(self):
+        options = [("One", "CMODE_CINEMA", "15"), ("Two", "NO_SUCH_COMMAND", "15")]
+        with mock.patch.dict(registry.EPSON_OPTIONS, {'TEST': {'options': options}}), \
+                mock.patch.dict(registry.OPTION_NAMES, {'TEST': {"15": "Two"}}):
+            problems = registry.validate()
+        self.assertEqual(
+            problems,
+            ["TEST: options share a raw value", "TEST: option Two sends unknown command NO_SUCH_COMMAND"],
+        )
+
+
+class TranslationTest(unittest.TestCase):
+    def test_tables_match_formulas(self):
+        for translator, table in registry.TO_EPSON_TABLES.items():
+            for value, raw in enumerate(table):
+                self.assertEqual(raw, registry._to_epson(value, translator))
+        for translator, table in registry.FROM_EPSON_TABLES.items():
+            for value, human in enumerate(table):
+                self.assertEqual(human, registry._from_epson(value, translator))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Tests of queueing requests to the projector and holding them back while it is busy."""
+import asyncio
+import unittest
+
+from epson_projector import Projector
+from epson_projector.const import (
+    PRIORITY_POLL,
+    PRIORITY_USER,
+    PWR_COOLING_STATE,
+    PWR_OFF_STATE,
+    PWR_ON_STATE,
+    TURN_ON,
+)
+from epson_projector.lock import Lock
+from epson_projector.scheduler import RequestScheduler
+from epson_projector.simulator import ProjectorSimulator
+
+
+class RequestSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.scheduler = RequestScheduler(Lock())
+        self.ran = []
+        self.release = asyncio.Event()
+
+    async def asyncTearDown(self):
+        self.scheduler.close()
+
+    def request(self, name, result=None):
+        async def run():
+            self.ran.append(name)
+            return result
+        return run
+
+    async def block(self):
+        """Keep the worker busy until release is set."""
+        self.ran.append("block")
+        await self.release.wait()
+
+    async def test_user_requests_overtake_polls(self):
+        blocked = asyncio.create_task(self.scheduler.submit(self.block))
+        await asyncio.sleep(0)
+        poll = asyncio.create_task(self.scheduler.submit(self.request("poll"), priority=PRIORITY_POLL))
+        user = asyncio.create_task(self.scheduler.submit(self.request("user"), priority=PRIORITY_USER))
+        await asyncio.sleep(0)
+        self.release.set()
+
+        await asyncio.gather(blocked, poll, user)
+        self.assertEqual(self.ran, ["block", "user", "poll"])
+
+    async def test_request_expires_in_queue(self):
+        blocked = asyncio.create_task(self.scheduler.submit(self.block))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.scheduler.submit(self.request("late"), deadline=0.05)
+        self.release.set()
+        await blocked
+        self.assertEqual(self.ran, ["block"])
+
+    async def test_failed_request_leaves_worker_running(self):
+        async def fail():
+            raise Exception("Projector returned ERR for command")
+
+        with self.assertRaises(Exception):
+            await self.scheduler.submit(fail)
+        worker = self.scheduler._worker
+
+        self.assertEqual(await self.scheduler.submit(self.request("next", "ok")), "ok")
+        self.assertIs(self.scheduler._worker, worker)
+
+
+class BusyLockTest(unittest.IsolatedAsyncioTestCase):
+    async def start(self, **kwargs):
+        self.simulator = ProjectorSimulator(port=0, serial_port=None, **kwargs)
+        await self.simulator.start()
+        self.projector = Projector(self.simulator.host, port=self.simulator.port)
+
+    async def asyncTearDown(self):
+        self.projector.close()
+        await self.simulator.stop()
+
+    async def test_refused_power_on_does_not_lock(self):
+        await self.start(power=PWR_COOLING_STATE, cooldown_time=60)
+        with self.assertRaises(Exception):
+            await self.projector.send_command(TURN_ON)
+
+        self.assertEqual(self.projector._lock.time_remaining(), 0)
+        power = await asyncio.wait_for(self.projector.get_power(), 1)
+        self.assertEqual(power, PWR_COOLING_STATE)
+
+    async def test_power_on_locks_until_warmed_up(self):
+        await self.start(power=PWR_OFF_STATE, warmup_time=1)
+        await self.projector.send_command(TURN_ON)
+
+        self.assertGreater(self.projector._lock.time_remaining(), 0)
+        # Released by PWR? once warmed up instead of after the full 40 seconds.
+        power = await asyncio.wait_for(self.projector.get_power(), 5)
+        self.assertEqual(power, PWR_ON_STATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
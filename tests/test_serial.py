@@ -0,0 +1,30 @@
+"""Tests of the serial (RS-232) connection against a pseudo terminal."""
+import unittest
+
+from epson_projector import Projector
+from epson_projector.const import PWR_ON_STATE, SERIAL
+from epson_projector.simulator import ProjectorSimulator
+
+
+class SerialRoundTripTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = ProjectorSimulator(port=0, serial_port=None, power=PWR_ON_STATE)
+        await self.simulator.start()
+        path = await self.simulator.start_pty()
+        self.projector = Projector(path, type=SERIAL)
+
+    async def asyncTearDown(self):
+        self.projector.close()
+        await self.simulator.stop()
+
+    async def test_query_and_set(self):
+        self.assertEqual(await self.projector.get_power(), PWR_ON_STATE)
+        await self.projector.send_config_value("BRIGHTNESS", 40)
+        self.assertEqual(await self.projector.read_config_value("BRIGHTNESS"), 40)
+
+    async def test_serial_number(self):
+        self.assertEqual(await self.projector.get_serial_number(), self.simulator.serial_number)
+
+
+if __name__ == "__main__":
+    unittest.main()
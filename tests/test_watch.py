@@ -0,0 +1,59 @@
+"""Tests of watchers sharing the poll stream of a projector."""
+import asyncio
+import unittest
+
+from epson_projector import Projector
+from epson_projector.const import POWER, PWR_ON_STATE
+from epson_projector.simulator import ProjectorSimulator
+
+
+class WatchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = ProjectorSimulator(port=0, serial_port=None, power=PWR_ON_STATE)
+        await self.simulator.start()
+        self.projector = Projector(self.simulator.host, port=self.simulator.port)
+
+    async def asyncTearDown(self):
+        self.projector.close()
+        await self.simulator.stop()
+
+    async def collect(self, watcher, keys):
+        """Merge changes yielded by watcher until all keys were seen."""
+        values = {}
+        while not set(keys) <= set(values):
+            values.update(await asyncio.wait_for(anext(watcher), 5))
+        return values
+
+    async def test_watchers_share_one_poll_stream(self):
+        first = self.projector.watch([POWER, "BRIGHTNESS"])
+        second = self.projector.watch(["BRIGHTNESS", "CMODE"])
+        self.assertEqual(
+            await self.collect(first, [POWER, "BRIGHTNESS"]), {POWER: PWR_ON_STATE, "BRIGHTNESS": 50}
+        )
+        task = self.projector._watch._task
+
+        # Known values come right away, without polling them again.
+        requests = self.simulator.requests
+        self.assertEqual(await asyncio.wait_for(anext(second), 1), {"BRIGHTNESS": 50})
+        self.assertEqual(self.simulator.requests, requests)
+        self.assertEqual(await self.collect(second, ["CMODE"]), {"CMODE": "Dynamic"})
+        self.assertIs(self.projector._watch._task, task)
+
+        # A command makes what it touches get polled again, for every watcher.
+        await self.projector.send_config_value("BRIGHTNESS", 40)
+        self.assertEqual(await self.collect(first, ["BRIGHTNESS"]), {"BRIGHTNESS": 40})
+        self.assertEqual(await self.collect(second, ["BRIGHTNESS"]), {"BRIGHTNESS": 40})
+
+        await first.aclose()
+        self.assertIn("CMODE", self.projector._watch._poller)
+        await second.aclose()
+        self.assertIsNone(self.projector._watch._task)
+        self.assertNotIn("CMODE", self.projector._watch._poller)
+
+    async def test_unknown_property_is_refused(self):
+        with self.assertRaises(Exception):
+            await anext(self.projector.watch(["NO_SUCH_PROPERTY"]))
+
+
+if __name__ == "__main__":
+    unittest.main()